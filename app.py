@@ -1,12 +1,20 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, Response, stream_with_context, g, make_response
+from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 import psycopg2
-from psycopg2.extras import RealDictCursor
 from datetime import datetime
+import os
 import re
-import atexit
+import time
 from config.config import Config
 from services.ytdlp_service import YTDLPService
+from services.database import db_connection, pool_stats
+from services.clients import startup_timings
+from services.job_queue import DownloadJobQueue, serialize_job
+from services.progress import stream_job_events, stream_user_events
+from services.rate_limit import RateLimiter, DownloadSlots
+from services.media_stream import iter_object, accel_redirect_path
+from services.metrics import HTTP_REQUEST_SECONDS, render_metrics
 from utils import register_template_filters
 
 app = Flask(__name__)
@@ -15,86 +23,24 @@ app.config.from_object(Config)
 # Register template filters
 register_template_filters(app)
 
-# Initialize services
-ytdlp_service = YTDLPService()
-
-def get_db_connection():
-    """Get database connection"""
-    # print full url for debugging
-    # print(f"Connecting to database at {Config.POSTGRES_HOST}:{Config.POSTGRES_PORT}/{Config.POSTGRES_DB}")
-    return psycopg2.connect(
-        host=Config.POSTGRES_HOST,
-        port=Config.POSTGRES_PORT,
-        database=Config.POSTGRES_DB,
-        user=Config.POSTGRES_USER,
-        password=Config.POSTGRES_PASSWORD,
-        cursor_factory=RealDictCursor
-    )
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
 
-def init_db():
-    """Initialize database tables"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Users table
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+@app.after_request
+def record_request_metrics(response):
+    """Observe request latency by route template, so URLs with ids share a series"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint, response.status_code).observe(
+            time.perf_counter() - started
         )
-    ''')
-    
-    # Videos table for metadata storage
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS videos (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            video_id VARCHAR(50) NOT NULL,
-            title TEXT NOT NULL,
-            uploader VARCHAR(255),
-            duration INTEGER,
-            upload_date DATE,
-            view_count BIGINT,
-            like_count BIGINT,
-            tags TEXT[],
-            description TEXT,
-            thumbnail_url TEXT,
-            file_path TEXT,
-            file_size BIGINT,
-            format_id VARCHAR(50),
-            status VARCHAR(20) DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP,
-            minio_object_name TEXT,
-            UNIQUE(user_id, video_id)
-        )
-    ''')
-    
-    # Download queue table
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS download_queue (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            url TEXT NOT NULL,
-            format_id VARCHAR(50),
-            status VARCHAR(20) DEFAULT 'queued',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            started_at TIMESTAMP,
-            completed_at TIMESTAMP,
-            error_message TEXT
-        )
-    ''')
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+    return response
 
-# Initialize database when app starts
-with app.app_context():
-    init_db()
+# Initialize services, clients connect on first use
+ytdlp_service = YTDLPService()
+job_queue = DownloadJobQueue()
 
 def is_valid_url(url):
     """Validate YouTube URL"""
@@ -104,6 +50,77 @@ def is_valid_url(url):
     )
     return youtube_regex.match(url) is not None
 
+def too_many_requests(message, retry_after):
+    """429 response telling the client when to try again"""
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def take_rate_limit(name, per_minute, burst, cost=1):
+    """Charge the current user's bucket, returning 0 if allowed or the seconds to wait"""
+    if not Config.RATE_LIMIT_ENABLED or 'user_id' not in session:
+        return 0
+    return RateLimiter(ytdlp_service.redis_client).hit(name, session['user_id'], per_minute, burst, cost)
+
+def rate_limit(name, per_minute, burst):
+    """Limit how often each user can call a route"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            retry_after = take_rate_limit(name, per_minute, burst)
+            if retry_after:
+                return too_many_requests('Too many requests, please slow down', retry_after)
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def acquire_download_slots(count=1):
+    """Take download slots for the current user, or return None if they are all in use"""
+    return DownloadSlots(ytdlp_service.redis_client).acquire(session['user_id'], count)
+
+def release_download_slots(tokens):
+    """Give back slots that did not end up with a queued job"""
+    DownloadSlots(ytdlp_service.redis_client).release(session['user_id'], *tokens)
+
+def slots_exhausted():
+    return too_many_requests(
+        f'You already have {Config.USER_MAX_ACTIVE_DOWNLOADS} downloads queued or running',
+        Config.DOWNLOAD_SLOT_RETRY_AFTER
+    )
+
+def download_slot(f):
+    """Hold one of the user's download slots for the job a route queues
+    
+    The slot token is passed to the route as g.slot_token and given back if
+    the route does not succeed.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return f(*args, **kwargs)
+        
+        tokens = acquire_download_slots()
+        if tokens is None:
+            return slots_exhausted()
+        g.slot_token = tokens[0]
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            release_download_slots(tokens)
+            raise
+        if response.status_code >= 400:
+            release_download_slots(tokens)
+        return response
+    return wrapper
+
+def is_valid_playlist_url(url):
+    """Validate YouTube playlist URL"""
+    playlist_regex = re.compile(
+        r'(https?://)?(www\.|m\.)?youtube\.com/(playlist|watch)\?.*list=[\w-]+'
+    )
+    return playlist_regex.match(url) is not None
+
 @app.route('/')
 def index():
     """Home page"""
@@ -139,15 +156,13 @@ def register():
         password_hash = generate_password_hash(password)
         
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            cur.execute(
-                'INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)',
-                (username, email, password_hash)
-            )
-            conn.commit()
-            cur.close()
-            conn.close()
+            with db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    'INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)',
+                    (username, email, password_hash)
+                )
+                cur.close()
             
             flash('Registration successful! Please login.')
             return redirect(url_for('login'))
@@ -174,12 +189,11 @@ def login():
             return render_template('login.html')
         
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            cur.execute('SELECT * FROM users WHERE username = %s', (username,))
-            user = cur.fetchone()
-            cur.close()
-            conn.close()
+            with db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute('SELECT * FROM users WHERE username = %s', (username,))
+                user = cur.fetchone()
+                cur.close()
             
             if user and check_password_hash(user['password_hash'], password):
                 session['user_id'] = user['id']
@@ -200,36 +214,46 @@ def logout():
     flash('You have been logged out')
     return redirect(url_for('index'))
 
+def has_active_jobs(user_id):
+    """Whether the dashboard should listen for finishing downloads"""
+    try:
+        return job_queue.has_active_jobs(user_id)
+    except Exception as e:
+        app.logger.error(f'Active jobs error: {str(e)}')
+        return False
+
 @app.route('/dashboard')
 def dashboard():
     """User dashboard"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search_query = request.args.get('search', '')
     
     try:
         videos_data = ytdlp_service.get_user_videos(
             session['user_id'], 
-            page=page,
+            cursor=cursor,
             search_query=search_query
         )
         return render_template('dashboard.html', 
                              videos=videos_data['videos'],
                              pagination=videos_data,
                              search_query=search_query,
+                             watch_jobs=has_active_jobs(session['user_id']),
                              ga_id=Config.GA_TRACKING_ID)
     except Exception as e:
         app.logger.error(f'Dashboard error: {str(e)}')
         flash(f'Error loading videos: {str(e)}')
         return render_template('dashboard.html', 
                              videos=[], 
-                             pagination={'total': 0, 'page': 1, 'pages': 1},
+                             pagination={'total': 0, 'total_exact': True, 'next_cursor': None, 'prev_cursor': None},
                              search_query=search_query,
                              ga_id=Config.GA_TRACKING_ID)
 
 @app.route('/api/video-info', methods=['POST'])
+@rate_limit('video_info', Config.RATE_LIMIT_VIDEO_INFO_PER_MINUTE, Config.RATE_LIMIT_VIDEO_INFO_BURST)
 def get_video_info():
     """Get video information"""
     if 'user_id' not in session:
@@ -252,8 +276,10 @@ def get_video_info():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/download', methods=['POST'])
+@rate_limit('download', Config.RATE_LIMIT_DOWNLOAD_PER_MINUTE, Config.RATE_LIMIT_DOWNLOAD_BURST)
+@download_slot
 def download_video():
-    """Download video"""
+    """Queue a video download"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -268,34 +294,274 @@ def download_video():
         return jsonify({'error': 'Invalid YouTube URL'}), 400
     
     try:
-        info = ytdlp_service.get_video_info(url)
-        available_format_ids = [f['format_id'] for f in info.get('formats', [])]
-        if format_id not in available_format_ids:
-            return jsonify({
-                'error': 'Requested format is not available',
-                'available_formats': available_format_ids
-            }), 400
+        # Validate against the extraction cache when the info is already there,
+        # the worker repeats these checks for anything not yet extracted
+        info = ytdlp_service.get_cached_info(url)
+        if info:
+            available_format_ids = ytdlp_service.available_format_ids(info)
+            if format_id and format_id not in available_format_ids:
+                return jsonify({
+                    'error': 'Requested format is not available',
+                    'available_formats': available_format_ids
+                }), 400
+            
+            estimated_size = ytdlp_service.estimate_download_size(info, format_id)
+            if estimated_size and estimated_size > Config.MAX_VIDEO_SIZE * 1024 * 1024:
+                return jsonify({
+                    'error': f'Video size exceeds {Config.MAX_VIDEO_SIZE}MB limit',
+                    'estimated_size': estimated_size
+                }), 413
         
-        result = ytdlp_service.download_video(url, session['user_id'], format_id)
-        return jsonify(result)
+        job = job_queue.enqueue(session['user_id'], url, format_id, g.slot_token)
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': url_for('job_status', job_id=job['id']),
+            'events_url': url_for('job_events', job_id=job['id'])
+        }), 202
     except Exception as e:
         app.logger.error(f'Download error: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<int:job_id>')
+def job_status(job_id):
+    """Get the status of a download job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        job = job_queue.get_job(job_id, session['user_id'])
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(serialize_job(job))
+    except Exception as e:
+        app.logger.error(f'Job status error: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+def event_stream(events):
+    """Wrap an SSE generator in a response that proxies will not buffer"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/jobs/<int:job_id>/events')
+def job_events(job_id):
+    """Stream progress events of a download job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        job = job_queue.get_job(job_id, session['user_id'])
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return event_stream(stream_job_events(ytdlp_service.redis_client, job))
+    except Exception as e:
+        app.logger.error(f'Job events error: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events')
+def user_events():
+    """Stream completion events of all of the user's download jobs"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user_id = session['user_id']
+    return event_stream(stream_user_events(
+        ytdlp_service.redis_client, user_id, lambda: job_queue.has_active_jobs(user_id)
+    ))
+
+@app.route('/api/batch-download', methods=['POST'])
+@rate_limit('download', Config.RATE_LIMIT_DOWNLOAD_PER_MINUTE, Config.RATE_LIMIT_DOWNLOAD_BURST)
+def batch_download():
+    """Queue downloads for a list of URLs or a playlist"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    urls = data.get('urls') or []
+    playlist_url = data.get('playlist_url')
+    format_id = data.get('format_id')
+    
+    if not isinstance(urls, list):
+        return jsonify({'error': 'urls must be a list'}), 400
+    
+    try:
+        if playlist_url:
+            if not is_valid_playlist_url(playlist_url):
+                return jsonify({'error': 'Invalid YouTube playlist URL'}), 400
+            # One entry past the cap is enough to tell the playlist was cut short
+            urls = urls + ytdlp_service.expand_playlist(playlist_url, limit=Config.BATCH_MAX_ITEMS + 1)
+        
+        # Drop duplicates but keep the order the user gave
+        urls = list(dict.fromkeys(url.strip() for url in urls if isinstance(url, str) and url.strip()))
+        rejected = [url for url in urls if not is_valid_url(url)]
+        valid = [url for url in urls if is_valid_url(url)]
+        accepted = valid[:Config.BATCH_MAX_ITEMS]
+        truncated = valid[Config.BATCH_MAX_ITEMS:]
+        
+        if not accepted:
+            return jsonify({'error': 'No valid YouTube URLs', 'rejected': rejected}), 400
+        
+        # Every queued video costs a token, a request can cost at most a full bucket
+        retry_after = take_rate_limit(
+            'batch_items', Config.RATE_LIMIT_BATCH_ITEMS_PER_MINUTE, Config.RATE_LIMIT_BATCH_ITEMS_BURST,
+            cost=min(len(accepted), Config.RATE_LIMIT_BATCH_ITEMS_BURST)
+        )
+        if retry_after:
+            return too_many_requests('Too many batch downloads, please slow down', retry_after)
+        
+        # Every item holds a download slot, the batch is refused unless all fit
+        slot_tokens = acquire_download_slots(len(accepted))
+        if slot_tokens is None:
+            return slots_exhausted()
+        try:
+            batch_id, jobs = job_queue.enqueue_batch(session['user_id'], accepted, format_id, slot_tokens)
+        except Exception:
+            release_download_slots(slot_tokens)
+            raise
+        return jsonify({
+            'batch_id': batch_id,
+            'status_url': url_for('batch_status', batch_id=batch_id),
+            'jobs': [
+                {
+                    'job_id': job['id'],
+                    'url': job['url'],
+                    'status': job['status'],
+                    'events_url': url_for('job_events', job_id=job['id'])
+                }
+                for job in jobs
+            ],
+            'rejected': rejected,
+            'truncated': truncated
+        }), 202
+    except Exception as e:
+        app.logger.error(f'Batch download error: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batches/<batch_id>')
+def batch_status(batch_id):
+    """Get per-item status of a batch download"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        jobs = job_queue.get_batch(batch_id, session['user_id'])
+        if not jobs:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        counts = {}
+        for job in jobs:
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        
+        return jsonify({
+            'batch_id': batch_id,
+            'total': len(jobs),
+            'counts': counts,
+            'done': counts.get('completed', 0) + counts.get('failed', 0) == len(jobs),
+            'items': [serialize_job(job) for job in jobs]
+        })
+    except Exception as e:
+        app.logger.error(f'Batch status error: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+def video_stream_response(video_id, attachment=False):
+    """Serve a video, or the single byte range the client asked for, from MinIO"""
+    user_id = session['user_id']
+    if Config.STREAM_ACCEL_REDIRECT:
+        # nginx fetches the object from MinIO itself and handles the range
+        if attachment:
+            url = ytdlp_service.get_attachment_url(video_id, user_id)
+        else:
+            url = ytdlp_service.get_download_url(video_id, user_id)
+        return Response(headers={'X-Accel-Redirect': accel_redirect_path(url)})
+    
+    target = ytdlp_service.get_stream_target(video_id, user_id)
+    size = target['size']
+    etag = target['etag']
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'private, no-transform'
+    }
+    if attachment:
+        headers['Content-Disposition'] = f'attachment; filename="{os.path.basename(target["object_name"])}"'
+    
+    byte_range = request.range
+    # A range is only valid against the copy the client already has part of
+    if 'If-Range' in request.headers and request.if_range.etag != etag:
+        byte_range = None
+    
+    offset, length, status = 0, size, 200
+    if byte_range and len(byte_range.ranges) == 1:
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        offset, length, status = start, stop - start, 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    headers['Content-Length'] = str(length)
+    
+    chunks = iter_object(ytdlp_service.minio_client, Config.MINIO_BUCKET, target['object_name'], offset, length)
+    return Response(chunks, status=status, mimetype=target['content_type'], headers=headers,
+                    direct_passthrough=True)
+
+@app.route('/stream/<video_id>')
+def stream_video(video_id):
+    """Stream a video with HTTP range support, for playback and seeking"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        return video_stream_response(video_id)
+    except Exception as e:
+        app.logger.error(f'Stream error: {str(e)}')
+        return jsonify({'error': 'Video not found'}), 404
+
 @app.route('/download/<video_id>')
 def download_file(video_id):
-    """Generate download URL"""
+    """Download a video, resumable through range requests"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        download_url = ytdlp_service.get_download_url(video_id, session['user_id'])
-        return redirect(download_url)
+        if Config.PRESIGNED_DOWNLOADS:
+            return redirect(ytdlp_service.get_download_url(video_id, session['user_id']))
+        return video_stream_response(video_id, attachment=True)
     except Exception as e:
         app.logger.error(f'File download error: {str(e)}')
         flash(f'Download error: {str(e)}')
         return redirect(url_for('dashboard'))
 
+@app.route('/thumbnail/<video_id>')
+def thumbnail(video_id):
+    """Serve a video's stored thumbnail"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        thumb = ytdlp_service.get_thumbnail(video_id, session['user_id'], request.if_none_match)
+    except Exception as e:
+        app.logger.error(f'Thumbnail error: {str(e)}')
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    
+    if not thumb:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    
+    headers = {
+        'ETag': f'"{thumb["etag"]}"',
+        # Stored thumbnails never change, but they are only visible to their owner
+        'Cache-Control': f'private, max-age={Config.THUMBNAIL_CACHE_MAX_AGE}, immutable'
+    }
+    if thumb['data'] is None:
+        return Response(status=304, headers=headers)
+    return Response(thumb['data'], mimetype='image/jpeg', headers=headers)
+
 @app.route('/api/delete/<video_id>', methods=['DELETE'])
 def delete_video(video_id):
     """Delete a video"""
@@ -309,18 +575,25 @@ def delete_video(video_id):
         app.logger.error(f'Delete error: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/cleanup')
-def cleanup_expired():
-    """Cleanup expired videos (admin endpoint)"""
-    # Add basic authentication check for admin functions
+@app.route('/api/videos/delete', methods=['POST'])
+def delete_videos():
+    """Delete several videos at once"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
-        count = ytdlp_service.cleanup_expired_videos()
-        return jsonify({'cleaned': count})
+        data = request.get_json(silent=True) or {}
+        video_ids = data.get('video_ids')
+        if not isinstance(video_ids, list) or not video_ids:
+            return jsonify({'error': 'video_ids must be a non-empty list'}), 400
+        video_ids = [video_id for video_id in video_ids if isinstance(video_id, str) and video_id]
+        if len(video_ids) > Config.BULK_DELETE_MAX_ITEMS:
+            return jsonify({'error': f'At most {Config.BULK_DELETE_MAX_ITEMS} videos can be deleted at once'}), 400
+        
+        result = ytdlp_service.delete_videos(video_ids, session['user_id'])
+        return jsonify(result)
     except Exception as e:
-        app.logger.error(f'Cleanup error: {str(e)}')
+        app.logger.error(f'Bulk delete error: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/status')
@@ -328,9 +601,21 @@ def status():
     """API status endpoint"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'video_info_cache': ytdlp_service.video_info_cache.stats(),
+        'download_throughput': ytdlp_service.throughput.stats(),
+        'db_pool': pool_stats(),
+        'startup': startup_timings()
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics of every worker process"""
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {Config.METRICS_TOKEN}':
+        return jsonify({'error': 'Not authenticated'}), 401
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
@@ -339,14 +624,5 @@ def not_found(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
-# Register cleanup function to run on app shutdown
-@atexit.register
-def cleanup_on_exit():
-    """Cleanup function called when app shuts down"""
-    try:
-        ytdlp_service.cleanup_expired_videos()
-    except Exception as e:
-        app.logger.error(f'Cleanup on exit error: {str(e)}')
-
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""The web app with yt-dlp replaced by the offline stand-in, for gunicorn"""
+from benchmarks import fake_ytdlp
+
+fake_ytdlp.install()
+
+from app import app  # noqa: E402
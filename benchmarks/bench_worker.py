@@ -0,0 +1,9 @@
+"""The download worker with yt-dlp replaced by the offline stand-in"""
+from benchmarks import fake_ytdlp
+
+fake_ytdlp.install()
+
+from worker import main  # noqa: E402
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare two benchmark reports
+
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/candidate.json
+
+Rows are matched by scenario and concurrency. A row regresses when its p99
+latency grows, or its throughput drops, by more than --threshold percent.
+"""
+import sys
+import argparse
+from benchmarks.report import load
+
+def change(before, after):
+    """Percent change from before to after, or None when either is missing"""
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+def compare(baseline, candidate, threshold):
+    """Return (lines, regressions) comparing candidate against baseline"""
+    before = {(row['scenario'], row['concurrency']): row for row in baseline['results']}
+    lines = [f"{'scenario':<20} {'conc':>5} {'p50 ms':>20} {'p99 ms':>20} {'throughput':>22}"]
+    regressions = []
+    for row in candidate['results']:
+        key = (row['scenario'], row['concurrency'])
+        old = before.get(key)
+        if old is None:
+            lines.append(f"{row['scenario']:<20} {row['concurrency']:>5} (not in baseline)")
+            continue
+
+        cells = []
+        for field in ('p50_ms', 'p99_ms', 'throughput'):
+            delta = change(old.get(field), row.get(field))
+            delta_text = f"{delta:+.1f}%" if delta is not None else 'n/a'
+            cells.append(f"{old.get(field)} -> {row.get(field)} ({delta_text})")
+
+        p99_change = change(old.get('p99_ms'), row.get('p99_ms'))
+        throughput_change = change(old.get('throughput'), row.get('throughput'))
+        regressed = (
+            (p99_change is not None and p99_change > threshold)
+            or (throughput_change is not None and throughput_change < -threshold)
+            or row.get('errors', 0) > old.get('errors', 0)
+        )
+        if regressed:
+            regressions.append(key)
+        marker = '  REGRESSION' if regressed else ''
+        lines.append(f"{row['scenario']:<20} {row['concurrency']:>5} {cells[0]:>20} {cells[1]:>20} {cells[2]:>22}{marker}")
+    return lines, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change treated as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on any regression')
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    print(f"baseline:  {baseline['label']} ({baseline['git_commit']}, {baseline['created_at']})")
+    print(f"candidate: {candidate['label']} ({candidate['git_commit']}, {candidate['created_at']})")
+    if baseline.get('settings') != candidate.get('settings'):
+        print("warning: the reports were produced with different settings")
+    print()
+
+    lines, regressions = compare(baseline, candidate, args.threshold)
+    print('\n'.join(lines))
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:g}%")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
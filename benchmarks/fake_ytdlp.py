@@ -0,0 +1,122 @@
+"""Offline stand-in for yt-dlp used by the benchmarks
+
+Every YouTube URL resolves to a synthetic video with a few MP4 formats, and
+downloads write zero bytes at a fixed rate. Tune it with:
+
+    BENCH_EXTRACT_LATENCY  seconds an extraction takes (default 0.3)
+    BENCH_DOWNLOAD_MBPS    download speed in MB/s (default 50)
+    BENCH_VIDEO_SIZE_MB    size of the largest format in MB (default 5)
+"""
+import os
+import time
+import zlib
+import yt_dlp
+
+EXTRACT_LATENCY = float(os.getenv('BENCH_EXTRACT_LATENCY', '0.3'))
+DOWNLOAD_MBPS = float(os.getenv('BENCH_DOWNLOAD_MBPS', '50'))
+VIDEO_SIZE_MB = float(os.getenv('BENCH_VIDEO_SIZE_MB', '5'))
+
+CHUNK_SIZE = 256 * 1024
+# (format_id, height, share of the largest format's size)
+FORMATS = (('18', 360, 0.25), ('22', 720, 1.0))
+
+def synthetic_info(url):
+    """Info dict for a made-up video, the same every time for a URL"""
+    video_id = url.rstrip('/').split('=')[-1].split('/')[-1][:11]
+    seed = zlib.crc32(video_id.encode())
+    duration = 60 + seed % 600
+    largest = int(VIDEO_SIZE_MB * 1024 * 1024)
+    formats = [
+        {
+            'format_id': format_id,
+            'ext': 'mp4',
+            'height': height,
+            'protocol': 'https',
+            'url': f'https://bench.invalid/{video_id}/{format_id}',
+            'filesize': int(largest * share),
+            'tbr': int(largest * share) * 8 / 1000 / duration,
+            'vcodec': 'avc1',
+            'acodec': 'mp4a',
+        }
+        for format_id, height, share in FORMATS
+    ]
+    return {
+        'id': video_id,
+        'title': f'Benchmark video {video_id}',
+        'duration': duration,
+        'uploader': 'bench',
+        'upload_date': '20240101',
+        'description': 'Synthetic video served by the benchmark yt-dlp stand-in',
+        'thumbnail': '',
+        'view_count': seed % 1000000,
+        'webpage_url': url,
+        'formats': formats,
+    }
+
+class FakeYoutubeDL:
+    """Implements the parts of yt_dlp.YoutubeDL the app uses"""
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @staticmethod
+    def sanitize_info(info, remove_private_keys=False):
+        return info
+
+    def extract_info(self, url, download=True):
+        time.sleep(EXTRACT_LATENCY)
+        info = synthetic_info(url)
+        if download:
+            return self.process_ie_result(info, download=True)
+        return info
+
+    def process_ie_result(self, info, download=True):
+        if not download:
+            return info
+        fmt = self._select(info)
+        path = self.params['outtmpl'].replace('%(ext)s', fmt['ext'])
+        size = fmt['filesize']
+        max_filesize = self.params.get('max_filesize')
+        if max_filesize and size > max_filesize:
+            # yt-dlp skips the file without raising
+            return dict(info, requested_downloads=[])
+
+        self._write(path, size)
+        return dict(info, format_id=fmt['format_id'], requested_downloads=[{'filepath': path}])
+
+    def _select(self, info):
+        wanted = self.params.get('format', '')
+        for fmt in info['formats']:
+            if fmt['format_id'] == wanted:
+                return fmt
+        return info['formats'][-1]
+
+    def _write(self, path, size):
+        """Write size bytes at DOWNLOAD_MBPS, reporting progress like yt-dlp"""
+        hooks = self.params.get('progress_hooks', [])
+        rate = DOWNLOAD_MBPS * 1024 * 1024
+        chunk = b'\0' * CHUNK_SIZE
+        started = time.perf_counter()
+        written = 0
+        with open(path, 'wb') as f:
+            while written < size:
+                n = min(CHUNK_SIZE, size - written)
+                f.write(chunk[:n])
+                written += n
+                ahead = written / rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+                for hook in hooks:
+                    hook({'status': 'downloading', 'downloaded_bytes': written, 'total_bytes': size})
+        for hook in hooks:
+            hook({'status': 'finished', 'downloaded_bytes': size, 'total_bytes': size, 'filename': path})
+
+def install():
+    """Make every later yt_dlp.YoutubeDL(...) call use the stand-in"""
+    yt_dlp.YoutubeDL = FakeYoutubeDL
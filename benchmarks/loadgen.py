@@ -0,0 +1,256 @@
+"""Load generator for the benchmark stack
+
+Drives the running app over HTTP at each concurrency level and times the
+expired video cleanup in-process, then writes a JSON report that
+benchmarks/compare.py can diff against another run.
+
+    python -m benchmarks.loadgen --label baseline --concurrency 1,8,32
+"""
+import io
+import os
+import json
+import time
+import uuid
+import argparse
+import itertools
+import threading
+import subprocess
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import urllib3
+from benchmarks import fake_ytdlp
+from benchmarks.report import summarize, save, format_table
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+class Client:
+    """Logged in HTTP client shared by every load thread"""
+
+    def __init__(self, base_url, maxsize):
+        self.base_url = base_url.rstrip('/')
+        self.http = urllib3.PoolManager(maxsize=maxsize, block=True, timeout=urllib3.Timeout(total=120))
+        self.cookie = None
+
+    def request(self, method, path, body=None, fields=None):
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        kwargs = {}
+        if body is not None:
+            kwargs['body'] = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        elif fields is not None:
+            kwargs['fields'] = fields
+            kwargs['encode_multipart'] = False
+        return self.http.request(method, f"{self.base_url}{path}", headers=headers, redirect=False, **kwargs)
+
+    def wait_until_ready(self, timeout=180):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.request('GET', '/api/status').status == 200:
+                    return
+            except urllib3.exceptions.HTTPError:
+                pass
+            time.sleep(2)
+        raise SystemExit(f"{self.base_url} did not become ready within {timeout}s")
+
+    def login(self, username, password):
+        self.request('POST', '/register', fields={
+            'username': username, 'email': f'{username}@bench.invalid', 'password': password
+        })
+        response = self.request('POST', '/login', fields={'username': username, 'password': password})
+        cookie = response.headers.get('Set-Cookie')
+        if response.status != 302 or not cookie:
+            raise SystemExit(f"Login as {username} failed with {response.status}")
+        self.cookie = cookie.split(';', 1)[0]
+
+class VideoIds:
+    """Unique 11 character YouTube ids, so runs never share cache entries"""
+
+    def __init__(self):
+        self.prefix = uuid.uuid4().hex[:4]
+        self.counter = itertools.count()
+
+    def next_url(self):
+        return f"https://www.youtube.com/watch?v={self.prefix}{next(self.counter):07d}"
+
+def run_level(scenario, concurrency, total, call):
+    """Run call(i) total times on concurrency threads and summarize the latencies"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception as e:
+            print(f"{scenario} request failed: {e}")
+            ok = False
+        took = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(took)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    return summarize(scenario, concurrency, latencies, errors, time.perf_counter() - started)
+
+def wait_for_jobs(client, job_ids, timeout):
+    """Poll until every job finished, returning (created_at, completed_at) of the completed ones"""
+    pending = set(job_ids)
+    finished = []
+    failed = 0
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            job = json.loads(client.request('GET', f'/api/jobs/{job_id}').data)
+            if job.get('status') == 'completed':
+                finished.append((datetime.fromisoformat(job['created_at']),
+                                 datetime.fromisoformat(job['completed_at'])))
+                pending.discard(job_id)
+            elif job.get('status') == 'failed':
+                failed += 1
+                pending.discard(job_id)
+        if pending:
+            time.sleep(1)
+    return finished, failed + len(pending)
+
+def download_scenarios(client, ids, concurrency, total, job_timeout):
+    """Time queueing downloads, then how long the worker took to finish them"""
+    job_ids = []
+    lock = threading.Lock()
+
+    def submit(i):
+        response = client.request('POST', '/api/download', body={'url': ids.next_url()})
+        if response.status != 202:
+            return False
+        with lock:
+            job_ids.append(json.loads(response.data)['job_id'])
+        return True
+
+    queued = run_level('download', concurrency, total, submit)
+    finished, failed = wait_for_jobs(client, job_ids, job_timeout)
+    latencies = [(done - created).total_seconds() for created, done in finished]
+    elapsed = 0.0
+    if finished:
+        elapsed = (max(done for _, done in finished) - min(created for created, _ in finished)).total_seconds()
+    return [queued, summarize('download_complete', concurrency, latencies, failed, elapsed)]
+
+def cleanup_scenario(size):
+    """Seed size expired videos with one object each and time the cleanup job"""
+    from elasticsearch import helpers
+    from config.config import Config
+    from services.es_schema import VIDEOS_INDEX
+    from services.ytdlp_service import YTDLPService
+
+    service = YTDLPService()
+    expired = (datetime.now() - timedelta(days=1)).isoformat()
+    video_ids = [str(uuid.uuid4()) for _ in range(size)]
+
+    def put(video_id):
+        service.minio_client.put_object(Config.MINIO_BUCKET, f"bench/{video_id}.mp4", io.BytesIO(b''), 0,
+                                        content_type='video/mp4')
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(put, video_ids))
+    helpers.bulk(service.es, (
+        {
+            '_index': VIDEOS_INDEX,
+            '_id': video_id,
+            '_routing': 'bench',
+            '_source': {
+                'video_id': video_id,
+                'user_id': 0,
+                'title': 'Expired benchmark video',
+                'file_size': 0,
+                'download_date': expired,
+                'expiry_date': expired,
+                'object_name': f"bench/{video_id}.mp4",
+                'status': 'completed'
+            }
+        }
+        for video_id in video_ids
+    ), refresh='wait_for')
+
+    stats = service.cleanup_expired_videos()
+    row = summarize(f'cleanup_{size}', 1, [stats['seconds']], stats['errors'], stats['seconds'])
+    row['requests'] = stats['deleted']
+    row['throughput'] = stats['docs_per_second']
+    return row
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return os.getenv('BENCH_COMMIT', 'unknown')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the app against the offline stack')
+    parser.add_argument('--url', default=os.getenv('BENCH_URL', 'http://localhost:5000'))
+    parser.add_argument('--label', default=datetime.now().strftime('%Y%m%d-%H%M%S'))
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=200, help='requests per level for read scenarios')
+    parser.add_argument('--downloads', type=int, default=40, help='downloads queued per level')
+    parser.add_argument('--cleanup-sizes', default='100,1000', help='expired videos per cleanup run')
+    parser.add_argument('--job-timeout', type=int, default=600, help='seconds to wait for queued downloads')
+    parser.add_argument('--scenarios', default='video_info,video_info_cached,download,dashboard,cleanup')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    scenarios = set(args.scenarios.split(','))
+    client = Client(args.url, maxsize=max(levels))
+    client.wait_until_ready()
+    client.login(f"bench_{uuid.uuid4().hex[:8]}", 'bench-password')
+    ids = VideoIds()
+
+    warm_urls = [ids.next_url() for _ in range(20)]
+    for url in warm_urls:
+        client.request('POST', '/api/video-info', body={'url': url})
+
+    rows = []
+    for concurrency in levels:
+        if 'video_info' in scenarios:
+            rows.append(run_level('video_info', concurrency, args.requests, lambda i: client.request(
+                'POST', '/api/video-info', body={'url': ids.next_url()}).status == 200))
+        if 'video_info_cached' in scenarios:
+            rows.append(run_level('video_info_cached', concurrency, args.requests, lambda i: client.request(
+                'POST', '/api/video-info', body={'url': warm_urls[i % len(warm_urls)]}).status == 200))
+        if 'download' in scenarios:
+            rows.extend(download_scenarios(client, ids, concurrency, args.downloads, args.job_timeout))
+        if 'dashboard' in scenarios:
+            rows.append(run_level('dashboard', concurrency, args.requests,
+                                  lambda i: client.request('GET', '/dashboard').status == 200))
+        print(format_table([row for row in rows if row['concurrency'] == concurrency]))
+    if 'cleanup' in scenarios:
+        for size in (int(size) for size in args.cleanup_sizes.split(',')):
+            rows.append(cleanup_scenario(size))
+
+    report = {
+        'label': args.label,
+        'created_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'settings': {
+            'concurrency': levels,
+            'requests': args.requests,
+            'downloads': args.downloads,
+            'extract_latency': fake_ytdlp.EXTRACT_LATENCY,
+            'download_mbps': fake_ytdlp.DOWNLOAD_MBPS,
+            'video_size_mb': fake_ytdlp.VIDEO_SIZE_MB,
+            'cpu_count': os.cpu_count(),
+        },
+        'results': rows,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.label}.json")
+    save(path, report)
+    print()
+    print(format_table(rows))
+    print(f"\nReport written to {path}")
+
+if __name__ == "__main__":
+    main()
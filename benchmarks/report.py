@@ -0,0 +1,45 @@
+"""Latency summaries and the JSON report format shared by loadgen and compare"""
+import json
+import math
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(scenario, concurrency, latencies, errors, elapsed):
+    """One result row from per-request latencies in seconds"""
+    values = sorted(latencies)
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': len(values) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': ms(sum(values) / len(values)) if values else None,
+        'p50_ms': ms(percentile(values, 50)),
+        'p90_ms': ms(percentile(values, 90)),
+        'p99_ms': ms(percentile(values, 99)),
+        'max_ms': ms(values[-1]) if values else None,
+    }
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+def format_table(rows):
+    """Plain text table of result rows"""
+    columns = ('scenario', 'concurrency', 'requests', 'errors', 'throughput', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms')
+    lines = [columns] + [tuple('-' if row.get(c) is None else str(row[c]) for c in columns) for row in rows]
+    widths = [max(len(line[i]) for line in lines) for i in range(len(columns))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(line, widths)) for line in lines)
@@ -15,15 +15,27 @@ class Config:
     POSTGRES_USER = os.getenv('POSTGRES_USER', 'postgres')
     POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
     
+    POSTGRES_POOL_MIN = int(os.getenv('POSTGRES_POOL_MIN', '1'))
+    POSTGRES_POOL_MAX = int(os.getenv('POSTGRES_POOL_MAX', '10'))
+    POSTGRES_POOL_TIMEOUT = float(os.getenv('POSTGRES_POOL_TIMEOUT', '5'))  # seconds
+    POSTGRES_POOL_PRE_PING = os.getenv('POSTGRES_POOL_PRE_PING', 'True').lower() == 'true'
+    
     DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     
     # Redis Configuration
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Cache Configuration
+    VIDEO_INFO_CACHE_TTL = int(os.getenv('VIDEO_INFO_CACHE_TTL', '1800'))  # seconds
+    VIDEO_INFO_LOCK_TIMEOUT = int(os.getenv('VIDEO_INFO_LOCK_TIMEOUT', '60'))  # seconds
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))  # seconds
+    DASHBOARD_TRACK_TOTAL_HITS = int(os.getenv('DASHBOARD_TRACK_TOTAL_HITS', '1000'))
+    
     # Elasticsearch Configuration
     ELASTICSEARCH_HOST = os.getenv('ELASTICSEARCH_HOST', 'localhost')
     ELASTICSEARCH_PORT = os.getenv('ELASTICSEARCH_PORT', '9200')
     ELASTICSEARCH_URL = f"http://{ELASTICSEARCH_HOST}:{ELASTICSEARCH_PORT}"
+    ELASTICSEARCH_SHARDS = int(os.getenv('ELASTICSEARCH_SHARDS', '1'))
     
     # MinIO Configuration
     MINIO_ENDPOINT = os.getenv('MINIO_ENDPOINT', 'localhost:9000')
@@ -39,4 +51,89 @@ class Config:
     VIDEO_EXPIRY_DAYS = int(os.getenv('VIDEO_EXPIRY_DAYS', '30'))
     MAX_VIDEO_SIZE = int(os.getenv('MAX_VIDEO_SIZE', '500'))  # MB
     ALLOWED_FORMATS = ['mp4', 'webm', 'mkv', 'avi']
-    
\ No newline at end of file
+    STREAMING_UPLOAD = os.getenv('STREAMING_UPLOAD', 'False').lower() == 'true'
+    STREAM_UPLOAD_PART_SIZE = int(os.getenv('STREAM_UPLOAD_PART_SIZE', '16'))  # MB
+    
+    # Download Profile
+    YTDLP_CONCURRENT_FRAGMENTS = int(os.getenv('YTDLP_CONCURRENT_FRAGMENTS', '4'))
+    YTDLP_HTTP_CHUNK_SIZE = int(os.getenv('YTDLP_HTTP_CHUNK_SIZE', str(10 * 1024 * 1024)))  # bytes, 0 disables
+    YTDLP_BUFFER_SIZE = int(os.getenv('YTDLP_BUFFER_SIZE', str(64 * 1024)))  # bytes
+    YTDLP_RETRIES = int(os.getenv('YTDLP_RETRIES', '10'))
+    YTDLP_FRAGMENT_RETRIES = int(os.getenv('YTDLP_FRAGMENT_RETRIES', '10'))
+    YTDLP_EXTERNAL_DOWNLOADER = os.getenv('YTDLP_EXTERNAL_DOWNLOADER', '')  # e.g. aria2c
+    YTDLP_EXTERNAL_DOWNLOADER_ARGS = os.getenv('YTDLP_EXTERNAL_DOWNLOADER_ARGS', '')
+    DOWNLOAD_SIDECARS = os.getenv('DOWNLOAD_SIDECARS', 'none').lower()  # none or upload
+    
+    # Download Links
+    DOWNLOAD_URL_EXPIRY = int(os.getenv('DOWNLOAD_URL_EXPIRY', '3600'))  # seconds a signed URL works
+    DOWNLOAD_URL_REFRESH_MARGIN = int(os.getenv('DOWNLOAD_URL_REFRESH_MARGIN', '600'))  # seconds
+    VIDEO_RECORD_CACHE_TTL = int(os.getenv('VIDEO_RECORD_CACHE_TTL', '3600'))  # seconds
+    STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', str(256 * 1024)))  # bytes
+    STREAM_ACCEL_REDIRECT = os.getenv('STREAM_ACCEL_REDIRECT', '')  # internal nginx location, empty streams through the app
+    PRESIGNED_DOWNLOADS = os.getenv('PRESIGNED_DOWNLOADS', 'False').lower() == 'true'  # redirect to MinIO, needs a public endpoint
+    
+    # Thumbnails
+    THUMBNAIL_ENABLED = os.getenv('THUMBNAIL_ENABLED', 'True').lower() == 'true'
+    THUMBNAIL_WIDTH = int(os.getenv('THUMBNAIL_WIDTH', '320'))
+    THUMBNAIL_HEIGHT = int(os.getenv('THUMBNAIL_HEIGHT', '180'))
+    THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+    THUMBNAIL_FETCH_TIMEOUT = float(os.getenv('THUMBNAIL_FETCH_TIMEOUT', '10'))  # seconds
+    THUMBNAIL_MAX_SOURCE_SIZE = int(os.getenv('THUMBNAIL_MAX_SOURCE_SIZE', str(5 * 1024 * 1024)))  # bytes
+    THUMBNAIL_CACHE_MAX_AGE = int(os.getenv('THUMBNAIL_CACHE_MAX_AGE', '86400'))  # seconds
+    
+    # Post-processing
+    POSTPROCESS_MODE = os.getenv('POSTPROCESS_MODE', 'off')  # off, remux or transcode
+    FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')
+    TRANSCODE_MAX_PROCESSES = int(os.getenv('TRANSCODE_MAX_PROCESSES', '0'))  # 0 uses every core
+    TRANSCODE_THREADS = int(os.getenv('TRANSCODE_THREADS', '2'))  # per ffmpeg process
+    TRANSCODE_NICE = int(os.getenv('TRANSCODE_NICE', '10'))
+    TRANSCODE_TIMEOUT = int(os.getenv('TRANSCODE_TIMEOUT', '1800'))  # seconds
+    TRANSCODE_TARGET_BITRATE = int(os.getenv('TRANSCODE_TARGET_BITRATE', '2500'))  # kbit/s
+    TRANSCODE_MAX_HEIGHT = int(os.getenv('TRANSCODE_MAX_HEIGHT', '1080'))
+    TRANSCODE_AUDIO_BITRATE = int(os.getenv('TRANSCODE_AUDIO_BITRATE', '128'))  # kbit/s
+    TRANSCODE_PRESET = os.getenv('TRANSCODE_PRESET', 'veryfast')
+    
+    # Download Queue
+    DOWNLOAD_WORKER_CONCURRENCY = int(os.getenv('DOWNLOAD_WORKER_CONCURRENCY', '2'))
+    DOWNLOAD_POLL_INTERVAL = float(os.getenv('DOWNLOAD_POLL_INTERVAL', '2'))
+    DOWNLOAD_JOB_TIMEOUT = int(os.getenv('DOWNLOAD_JOB_TIMEOUT', '3600'))  # seconds
+    DOWNLOAD_DEDUP_LOCK_WAIT = float(os.getenv('DOWNLOAD_DEDUP_LOCK_WAIT', '5'))  # seconds a job waits for another job storing the same video
+    DOWNLOAD_DEDUP_RETRY_DELAY = int(os.getenv('DOWNLOAD_DEDUP_RETRY_DELAY', '15'))  # seconds before a job that waited is run again
+    DOWNLOAD_HEARTBEAT_INTERVAL = float(os.getenv('DOWNLOAD_HEARTBEAT_INTERVAL', '15'))  # seconds
+    DOWNLOAD_JOB_LEASE = int(os.getenv('DOWNLOAD_JOB_LEASE', '60'))  # seconds without a heartbeat before a job is requeued
+    DOWNLOAD_STOP_TIMEOUT = int(os.getenv('DOWNLOAD_STOP_TIMEOUT', '30'))  # seconds running jobs get to finish on shutdown
+    DOWNLOAD_PER_USER_CONCURRENCY = int(os.getenv('DOWNLOAD_PER_USER_CONCURRENCY', '2'))
+    DOWNLOAD_GLOBAL_CONCURRENCY = int(os.getenv('DOWNLOAD_GLOBAL_CONCURRENCY', '8'))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+    PLAYLIST_EXPAND_TIMEOUT = int(os.getenv('PLAYLIST_EXPAND_TIMEOUT', '10'))  # socket timeout in seconds
+    BULK_DELETE_MAX_ITEMS = int(os.getenv('BULK_DELETE_MAX_ITEMS', '100'))
+    
+    # Rate Limits
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_VIDEO_INFO_PER_MINUTE = int(os.getenv('RATE_LIMIT_VIDEO_INFO_PER_MINUTE', '20'))
+    RATE_LIMIT_VIDEO_INFO_BURST = int(os.getenv('RATE_LIMIT_VIDEO_INFO_BURST', '10'))
+    RATE_LIMIT_DOWNLOAD_PER_MINUTE = int(os.getenv('RATE_LIMIT_DOWNLOAD_PER_MINUTE', '10'))
+    RATE_LIMIT_DOWNLOAD_BURST = int(os.getenv('RATE_LIMIT_DOWNLOAD_BURST', '5'))
+    RATE_LIMIT_BATCH_ITEMS_PER_MINUTE = int(os.getenv('RATE_LIMIT_BATCH_ITEMS_PER_MINUTE', '30'))
+    RATE_LIMIT_BATCH_ITEMS_BURST = int(os.getenv('RATE_LIMIT_BATCH_ITEMS_BURST', str(BATCH_MAX_ITEMS)))
+    USER_MAX_ACTIVE_DOWNLOADS = int(os.getenv('USER_MAX_ACTIVE_DOWNLOADS', '50'))  # queued or running
+    DOWNLOAD_SLOT_TTL = int(os.getenv('DOWNLOAD_SLOT_TTL', '7200'))  # seconds
+    DOWNLOAD_SLOT_RETRY_AFTER = int(os.getenv('DOWNLOAD_SLOT_RETRY_AFTER', '30'))  # seconds
+    
+    # Progress Events
+    PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', '1'))  # seconds between byte updates
+    SSE_KEEPALIVE = int(os.getenv('SSE_KEEPALIVE', '15'))  # seconds
+    SSE_MAX_DURATION = int(os.getenv('SSE_MAX_DURATION', '3600'))  # seconds
+    
+    WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '9100'))  # 0 disables
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # bearer token required by /metrics, empty allows anyone
+    
+    # Maintenance Jobs
+    CLEANUP_INTERVAL_MINUTES = int(os.getenv('CLEANUP_INTERVAL_MINUTES', '60'))
+    CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', '500'))
+    METADATA_REFRESH_ENABLED = os.getenv('METADATA_REFRESH_ENABLED', 'True').lower() == 'true'
+    METADATA_REFRESH_INTERVAL_MINUTES = int(os.getenv('METADATA_REFRESH_INTERVAL_MINUTES', '60'))
+    METADATA_REFRESH_AGE_HOURS = int(os.getenv('METADATA_REFRESH_AGE_HOURS', '24'))  # refresh metadata older than this
+    METADATA_REFRESH_MAX_VIDEOS = int(os.getenv('METADATA_REFRESH_MAX_VIDEOS', '200'))  # YouTube videos per run
+    METADATA_REFRESH_CONCURRENCY = int(os.getenv('METADATA_REFRESH_CONCURRENCY', '4'))
+    METADATA_REFRESH_PER_MINUTE = int(os.getenv('METADATA_REFRESH_PER_MINUTE', '60'))  # extractions across workers
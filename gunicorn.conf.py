@@ -0,0 +1,34 @@
+import os
+import shutil
+import threading
+
+bind = '0.0.0.0:5000'
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+# Threads keep long lived event streams from tying up a whole worker
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = 120
+keepalive = 5
+
+# Import the app once in the master; clients are created per worker after fork
+preload_app = True
+
+# Workers write metrics to files that /metrics adds up. This has to be set
+# before the app imports prometheus_client, and files left by a previous
+# run would be added to the new totals.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def post_fork(server, worker):
+    from services.clients import warm_up
+
+    def report():
+        server.log.info(f"Worker {worker.pid} startup timings: {warm_up()}")
+
+    # Connect in the background so a slow dependency does not hold up the worker
+    threading.Thread(target=report, daemon=True).start()
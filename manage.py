@@ -0,0 +1,45 @@
+import argparse
+import time
+from elasticsearch import Elasticsearch
+from config.config import Config
+from services.es_schema import VIDEOS_INDEX, OBJECTS_INDEX, ensure_index_templates, reindex
+from services.db_schema import init_db
+from services.ytdlp_service import YTDLPService
+
+def migrate_command(args):
+    """Create database tables, the MinIO bucket and the index templates"""
+    started = time.perf_counter()
+    init_db()
+    print(f"database: {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    reindexed = YTDLPService().migrate()
+    for result in reindexed:
+        print(f"legacy index {', '.join(result['replaced'])}: copied {result['copied']} docs into {result['index']}")
+    print(f"bucket and index templates: {time.perf_counter() - started:.2f}s")
+
+def reindex_command(args):
+    """Rebuild indices from the current templates"""
+    es = Elasticsearch([Config.ELASTICSEARCH_URL])
+    ensure_index_templates(es)
+    for name in args.indices:
+        result = reindex(es, name)
+        print(f"{name}: copied {result['copied']} docs into {result['index']}, replaced {result['replaced'] or 'nothing'}")
+
+def main():
+    parser = argparse.ArgumentParser(description='YouTube Video Downloader maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='Create tables, bucket and index templates')
+    migrate_parser.set_defaults(func=migrate_command)
+
+    reindex_parser = subparsers.add_parser('reindex', help='Move existing data into indices built from the current templates')
+    reindex_parser.add_argument('indices', nargs='*', default=[VIDEOS_INDEX, OBJECTS_INDEX],
+                                choices=[VIDEOS_INDEX, OBJECTS_INDEX])
+    reindex_parser.set_defaults(func=reindex_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+import redis
+from minio import Minio
+from elasticsearch import Elasticsearch
+from config.config import Config
+from services.database import db_connection
+from services.metrics import InstrumentedClient
+
+_clients = {}
+_clients_lock = threading.Lock()
+_timings = {}
+
+def _reset_after_fork():
+    """Forget the parent's clients so a forked worker opens its own sockets"""
+    global _clients_lock
+    _clients.clear()
+    _timings.clear()
+    _clients_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _get(name, factory):
+    """Get this process's client, creating it on first use"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                started = time.perf_counter()
+                client = factory()
+                _timings.setdefault(name, {})['create_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                _clients[name] = client
+    return client
+
+def get_minio():
+    """MinIO client"""
+    return _get('minio', lambda: InstrumentedClient(Minio(
+        Config.MINIO_ENDPOINT,
+        access_key=Config.MINIO_ACCESS_KEY,
+        secret_key=Config.MINIO_SECRET_KEY,
+        secure=Config.MINIO_SECURE
+    ), 'minio'))
+
+def get_elasticsearch():
+    """Elasticsearch client"""
+    return _get('elasticsearch', lambda: InstrumentedClient(
+        Elasticsearch([Config.ELASTICSEARCH_URL]), 'elasticsearch', namespaces=('indices',)
+    ))
+
+def get_redis():
+    """Redis client"""
+    return _get('redis', lambda: redis.from_url(Config.REDIS_URL))
+
+def _ping_postgres():
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT 1')
+        cur.close()
+
+CHECKS = {
+    'postgres': _ping_postgres,
+    'redis': lambda: get_redis().ping(),
+    'elasticsearch': lambda: get_elasticsearch().info(),
+    'minio': lambda: get_minio().bucket_exists(Config.MINIO_BUCKET),
+}
+
+def warm_up():
+    """Open a connection to every dependency and record how long each took
+
+    Failures are recorded rather than raised, a dependency that is down
+    is connected to again on first use.
+    """
+    for name, check in CHECKS.items():
+        started = time.perf_counter()
+        try:
+            check()
+            error = None
+        except Exception as e:
+            error = str(e)
+            print(f"Startup check for {name} failed: {e}")
+        timing = _timings.setdefault(name, {})
+        timing['connect_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        timing['ok'] = error is None
+        if error:
+            timing['error'] = error
+    return startup_timings()
+
+def startup_timings():
+    """Client creation and first connection times of this process"""
+    return {name: dict(timing) for name, timing in _timings.items()}
@@ -0,0 +1,51 @@
+import json
+import hashlib
+from config.config import Config
+from services.metrics import cache_lookup
+
+class DashboardCache:
+    """Short lived Redis cache of dashboard pages per user
+
+    Each user has a generation counter that is part of every key, so
+    invalidating a user's pages is a single INCR and stale entries simply
+    age out.
+    """
+
+    KEY_PREFIX = 'dashboard:'
+    GENERATION_PREFIX = 'dashboard_gen:'
+
+    def __init__(self, redis_client, ttl=None):
+        self.redis_client = redis_client
+        self.ttl = ttl or Config.DASHBOARD_CACHE_TTL
+
+    def _key(self, user_id, *parts):
+        generation = self.redis_client.get(f"{self.GENERATION_PREFIX}{user_id}") or b'0'
+        digest = hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+        return f"{self.KEY_PREFIX}{user_id}:{generation.decode()}:{digest}"
+
+    def get(self, user_id, *parts):
+        """Get a cached page, or None"""
+        try:
+            raw = self.redis_client.get(self._key(user_id, *parts))
+        except Exception as e:
+            print(f"Dashboard cache read error: {e}")
+            return None
+        cache_lookup('dashboard', raw is not None)
+        return json.loads(raw) if raw else None
+
+    def set(self, user_id, page, *parts):
+        """Cache a page"""
+        try:
+            self.redis_client.set(self._key(user_id, *parts), json.dumps(page), ex=self.ttl)
+        except Exception as e:
+            print(f"Dashboard cache write error: {e}")
+
+    def invalidate(self, *user_ids):
+        """Drop every cached page for the given users"""
+        try:
+            pipe = self.redis_client.pipeline()
+            for user_id in set(user_ids):
+                pipe.incr(f"{self.GENERATION_PREFIX}{user_id}")
+            pipe.execute()
+        except Exception as e:
+            print(f"Dashboard cache invalidation error: {e}")
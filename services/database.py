@@ -0,0 +1,125 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor
+from config.config import Config
+from services.metrics import observe_call
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'checkouts': 0, 'discarded': 0, 'timeouts': 0, 'wait_seconds': 0.0}
+
+def get_pool():
+    """Get this process's connection pool, creating it on first use
+
+    The pool is keyed by pid so a forked worker never reuses sockets
+    opened by its parent.
+    """
+    global _pool, _pool_pid, _slots
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadedConnectionPool(
+                    Config.POSTGRES_POOL_MIN,
+                    Config.POSTGRES_POOL_MAX,
+                    host=Config.POSTGRES_HOST,
+                    port=Config.POSTGRES_PORT,
+                    database=Config.POSTGRES_DB,
+                    user=Config.POSTGRES_USER,
+                    password=Config.POSTGRES_PASSWORD,
+                    cursor_factory=RealDictCursor
+                )
+                # ThreadedConnectionPool raises when exhausted, the semaphore
+                # makes callers wait for a free connection instead
+                _slots = threading.BoundedSemaphore(Config.POSTGRES_POOL_MAX)
+                _pool_pid = os.getpid()
+    return _pool
+
+def _count(field, amount=1):
+    with _stats_lock:
+        _stats[field] += amount
+
+def _is_healthy(conn):
+    """Check a pooled connection before handing it out"""
+    if conn.closed:
+        return False
+    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        return False
+    if Config.POSTGRES_POOL_PRE_PING:
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+    return True
+
+def _checkout():
+    pool = get_pool()
+    slots = _slots
+    started = time.perf_counter()
+    if not slots.acquire(timeout=Config.POSTGRES_POOL_TIMEOUT):
+        _count('timeouts')
+        observe_call('postgres', 'checkout', started, failed=True)
+        raise Exception("Timed out waiting for a database connection")
+    _count('wait_seconds', time.perf_counter() - started)
+    observe_call('postgres', 'checkout', started)
+
+    try:
+        # A dead connection is replaced, give up after a full pool's worth
+        for _ in range(Config.POSTGRES_POOL_MAX + 1):
+            conn = pool.getconn()
+            if _is_healthy(conn):
+                _count('checkouts')
+                return pool, slots, conn
+            _count('discarded')
+            pool.putconn(conn, close=True)
+        raise Exception("No healthy database connection available")
+    except Exception:
+        slots.release()
+        raise
+
+@contextmanager
+def db_connection():
+    """Check out a pooled connection, committing on success and rolling back on error"""
+    pool, slots, conn = _checkout()
+    started = time.perf_counter()
+    try:
+        yield conn
+        conn.commit()
+        observe_call('postgres', 'transaction', started)
+    except Exception:
+        observe_call('postgres', 'transaction', started, failed=True)
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+        raise
+    finally:
+        try:
+            pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            slots.release()
+
+def pool_stats():
+    """Pool usage counters for monitoring"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+    stats['min'] = Config.POSTGRES_POOL_MIN
+    stats['max'] = Config.POSTGRES_POOL_MAX
+    if _pool is not None and _pool_pid == os.getpid():
+        stats['in_use'] = len(_pool._used)
+        stats['idle'] = len(_pool._pool)
+    else:
+        stats['in_use'] = 0
+        stats['idle'] = 0
+    return stats
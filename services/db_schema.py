@@ -0,0 +1,80 @@
+from services.database import db_connection
+
+def init_db():
+    """Initialize database tables"""
+    with db_connection() as conn:
+        _create_tables(conn.cursor())
+
+def _create_tables(cur):
+    """Create tables and indexes if they don't exist"""
+    
+    # Users table
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Videos table for metadata storage
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS videos (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            video_id VARCHAR(50) NOT NULL,
+            title TEXT NOT NULL,
+            uploader VARCHAR(255),
+            duration INTEGER,
+            upload_date DATE,
+            view_count BIGINT,
+            like_count BIGINT,
+            tags TEXT[],
+            description TEXT,
+            thumbnail_url TEXT,
+            file_path TEXT,
+            file_size BIGINT,
+            format_id VARCHAR(50),
+            status VARCHAR(20) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP,
+            minio_object_name TEXT,
+            UNIQUE(user_id, video_id)
+        )
+    ''')
+    
+    # Download queue table
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS download_queue (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            url TEXT NOT NULL,
+            format_id VARCHAR(50),
+            status VARCHAR(20) DEFAULT 'queued',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            error_message TEXT
+        )
+    ''')
+    cur.execute('ALTER TABLE download_queue ADD COLUMN IF NOT EXISTS result JSONB')
+    cur.execute('ALTER TABLE download_queue ADD COLUMN IF NOT EXISTS batch_id VARCHAR(36)')
+    cur.execute('ALTER TABLE download_queue ADD COLUMN IF NOT EXISTS slot_token VARCHAR(36)')
+    cur.execute('ALTER TABLE download_queue ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP')
+    cur.execute('ALTER TABLE download_queue ADD COLUMN IF NOT EXISTS run_after TIMESTAMP')
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_download_queue_queued
+        ON download_queue (id) WHERE status = 'queued'
+    ''')
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_download_queue_running
+        ON download_queue (user_id) WHERE status = 'running'
+    ''')
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_download_queue_batch
+        ON download_queue (batch_id) WHERE batch_id IS NOT NULL
+    ''')
+    
+    cur.close()
@@ -0,0 +1,84 @@
+import shlex
+from config.config import Config
+
+def download_options():
+    """yt-dlp network options from the configured download profile"""
+    options = {
+        'concurrent_fragment_downloads': Config.YTDLP_CONCURRENT_FRAGMENTS,
+        'buffersize': Config.YTDLP_BUFFER_SIZE,
+        'retries': Config.YTDLP_RETRIES,
+        'fragment_retries': Config.YTDLP_FRAGMENT_RETRIES,
+    }
+    if Config.YTDLP_HTTP_CHUNK_SIZE:
+        options['http_chunk_size'] = Config.YTDLP_HTTP_CHUNK_SIZE
+    if Config.YTDLP_EXTERNAL_DOWNLOADER:
+        options['external_downloader'] = {'default': Config.YTDLP_EXTERNAL_DOWNLOADER}
+        if Config.YTDLP_EXTERNAL_DOWNLOADER_ARGS:
+            options['external_downloader_args'] = {
+                'default': shlex.split(Config.YTDLP_EXTERNAL_DOWNLOADER_ARGS)
+            }
+    return options
+
+def download_cli_args():
+    """The same profile as yt-dlp command line arguments"""
+    args = [
+        '--concurrent-fragments', str(Config.YTDLP_CONCURRENT_FRAGMENTS),
+        '--buffer-size', str(Config.YTDLP_BUFFER_SIZE),
+        '--retries', str(Config.YTDLP_RETRIES),
+        '--fragment-retries', str(Config.YTDLP_FRAGMENT_RETRIES),
+    ]
+    if Config.YTDLP_HTTP_CHUNK_SIZE:
+        args += ['--http-chunk-size', str(Config.YTDLP_HTTP_CHUNK_SIZE)]
+    if Config.YTDLP_EXTERNAL_DOWNLOADER:
+        args += ['--downloader', Config.YTDLP_EXTERNAL_DOWNLOADER]
+        if Config.YTDLP_EXTERNAL_DOWNLOADER_ARGS:
+            args += ['--downloader-args', f"{Config.YTDLP_EXTERNAL_DOWNLOADER}:{Config.YTDLP_EXTERNAL_DOWNLOADER_ARGS}"]
+    return args
+
+class ThroughputStats:
+    """Transfer totals per format kept in a Redis hash
+
+    Each download adds its bytes and seconds under the format it used, so the
+    average rate per format can be compared across profile changes.
+    """
+
+    KEY = 'download_throughput'
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    def record(self, format_id, num_bytes, seconds):
+        """Add one transfer"""
+        if not format_id or not num_bytes or seconds <= 0:
+            return
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hincrby(self.KEY, f"{format_id}:bytes", int(num_bytes))
+            pipe.hincrbyfloat(self.KEY, f"{format_id}:seconds", seconds)
+            pipe.hincrby(self.KEY, f"{format_id}:count", 1)
+            pipe.execute()
+        except Exception as e:
+            print(f"Throughput stats error: {e}")
+
+    def stats(self):
+        """Downloads, bytes and average MB/s per format"""
+        try:
+            raw = self.redis_client.hgetall(self.KEY)
+        except Exception as e:
+            print(f"Throughput stats error: {e}")
+            return {}
+
+        totals = {}
+        for field, value in raw.items():
+            format_id, _, name = field.decode().rpartition(':')
+            totals.setdefault(format_id, {})[name] = float(value)
+
+        stats = {}
+        for format_id, total in totals.items():
+            seconds = total.get('seconds', 0)
+            stats[format_id] = {
+                'downloads': int(total.get('count', 0)),
+                'bytes': int(total.get('bytes', 0)),
+                'mb_per_second': round(total.get('bytes', 0) / seconds / 1024 / 1024, 2) if seconds else None
+            }
+        return stats
@@ -0,0 +1,81 @@
+import json
+import time
+from config.config import Config
+from services.metrics import cache_lookup
+
+class DownloadUrlCache:
+    """Redis cache of presigned download URLs and video ownership records
+
+    The record holds the few fields needed to authorize and sign a download,
+    so repeated clicks skip Elasticsearch. Signed URLs are dropped from the
+    cache DOWNLOAD_URL_REFRESH_MARGIN seconds before they stop working, so
+    a cached URL always has at least that long left.
+    """
+
+    URL_PREFIX = 'download_url:'
+    RECORD_PREFIX = 'video_record:'
+
+    def __init__(self, redis_client, record_ttl=None):
+        self.redis_client = redis_client
+        self.record_ttl = record_ttl or Config.VIDEO_RECORD_CACHE_TTL
+
+    def get(self, video_id):
+        """Get the cached (url entry, record) of a video, either may be None"""
+        try:
+            url, record = self.redis_client.mget(
+                f"{self.URL_PREFIX}{video_id}", f"{self.RECORD_PREFIX}{video_id}"
+            )
+        except Exception as e:
+            print(f"Download URL cache read error: {e}")
+            return None, None
+        cache_lookup('download_url', url is not None)
+        cache_lookup('video_record', record is not None)
+        return (json.loads(url) if url else None), (json.loads(record) if record else None)
+
+    def get_record(self, video_id):
+        """Get the cached ownership record of a video, or None"""
+        try:
+            record = self.redis_client.get(f"{self.RECORD_PREFIX}{video_id}")
+        except Exception as e:
+            print(f"Download URL cache read error: {e}")
+            return None
+        cache_lookup('video_record', record is not None)
+        return json.loads(record) if record else None
+
+    def set_record(self, video_id, record):
+        """Cache an ownership record until it or the video expires"""
+        ttl = min(self.record_ttl, int(record['expires_at'] - time.time()))
+        if ttl <= 0:
+            return
+        try:
+            self.redis_client.set(f"{self.RECORD_PREFIX}{video_id}", json.dumps(record), ex=ttl)
+        except Exception as e:
+            print(f"Download URL cache write error: {e}")
+
+    def set_url(self, video_id, user_id, url, expires_at):
+        """Cache a signed URL for the part of its lifetime it is safe to hand out"""
+        ttl = min(
+            Config.DOWNLOAD_URL_EXPIRY - Config.DOWNLOAD_URL_REFRESH_MARGIN,
+            int(expires_at - time.time())
+        )
+        if ttl <= 0:
+            return
+        try:
+            self.redis_client.set(
+                f"{self.URL_PREFIX}{video_id}",
+                json.dumps({'user_id': user_id, 'url': url}),
+                ex=ttl
+            )
+        except Exception as e:
+            print(f"Download URL cache write error: {e}")
+
+    def invalidate(self, *video_ids):
+        """Drop the cached URLs and records of the given videos"""
+        if not video_ids:
+            return
+        try:
+            keys = [f"{prefix}{video_id}" for video_id in video_ids
+                    for prefix in (self.URL_PREFIX, self.RECORD_PREFIX)]
+            self.redis_client.delete(*keys)
+        except Exception as e:
+            print(f"Download URL cache invalidation error: {e}")
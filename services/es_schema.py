@@ -0,0 +1,176 @@
+from datetime import datetime
+from config.config import Config
+
+VIDEOS_INDEX = 'video_downloads'
+OBJECTS_INDEX = 'video_objects'
+
+# Video docs are routed by user_id so dashboard queries hit a single shard,
+# and sorted on disk by download_date to match the dashboard order
+VIDEOS_TEMPLATE = {
+    'settings': {
+        'number_of_shards': Config.ELASTICSEARCH_SHARDS,
+        'index.sort.field': 'download_date',
+        'index.sort.order': 'desc'
+    },
+    'mappings': {
+        'dynamic': False,
+        '_routing': {'required': True},
+        'properties': {
+            'video_id': {'type': 'keyword'},
+            'user_id': {'type': 'keyword'},
+            'url': {'type': 'keyword', 'index': False},
+            'youtube_id': {'type': 'keyword'},
+            'format_id': {'type': 'keyword'},
+            'title': {'type': 'text'},
+            'uploader': {'type': 'text'},
+            # Searched from the dashboard, so kept indexed but without norms
+            'description': {'type': 'text', 'norms': False},
+            'duration': {'type': 'integer'},
+            'upload_date': {'type': 'keyword', 'index': False},
+            'thumbnail': {'type': 'keyword', 'index': False},
+            'view_count': {'type': 'long'},
+            'metadata_refreshed_at': {'type': 'date'},
+            'file_name': {'type': 'keyword', 'index': False},
+            'file_size': {'type': 'long'},
+            'download_date': {'type': 'date'},
+            'expiry_date': {'type': 'date'},
+            'object_name': {'type': 'keyword', 'index': False},
+            'info_object_name': {'type': 'keyword', 'index': False},
+            'thumbnail_object_name': {'type': 'keyword', 'index': False},
+            'object_key': {'type': 'keyword'},
+            'status': {'type': 'keyword'}
+        }
+    }
+}
+
+OBJECTS_TEMPLATE = {
+    'settings': {
+        'number_of_shards': 1
+    },
+    'mappings': {
+        'dynamic': False,
+        'properties': {
+            'object_key': {'type': 'keyword'},
+            'object_name': {'type': 'keyword', 'index': False},
+            'info_object_name': {'type': 'keyword', 'index': False},
+            'thumbnail_object_name': {'type': 'keyword', 'index': False},
+            'file_name': {'type': 'keyword', 'index': False},
+            'file_size': {'type': 'long'},
+            'ref_count': {'type': 'integer'},
+            'created_at': {'type': 'date'},
+            'last_used': {'type': 'date'}
+        }
+    }
+}
+
+TEMPLATES = {
+    VIDEOS_INDEX: VIDEOS_TEMPLATE,
+    OBJECTS_INDEX: OBJECTS_TEMPLATE,
+}
+
+# Fields added to a template after indices were created from it. Adding a
+# field to an existing mapping is allowed, changing one needs a reindex.
+ADDED_FIELDS = {
+    VIDEOS_INDEX: ('metadata_refreshed_at',),
+}
+
+def ensure_index_templates(es):
+    """Install or update the index templates"""
+    for name, template in TEMPLATES.items():
+        es.indices.put_index_template(
+            name=name,
+            index_patterns=[f'{name}*'],
+            template=template,
+            priority=100
+        )
+
+def ensure_added_fields(es):
+    """Map ADDED_FIELDS on indices that already exist"""
+    for name, fields in ADDED_FIELDS.items():
+        if not es.indices.exists(index=name):
+            continue
+        properties = TEMPLATES[name]['mappings']['properties']
+        es.indices.put_mapping(index=name, properties={field: properties[field] for field in fields})
+
+def legacy_indices(es):
+    """Names of existing indices whose mapping does not match their template
+
+    Indices created by dynamic mapping, before the templates were installed,
+    map keyword fields such as video_id as text, which cannot be sorted on,
+    and do not require routing.
+    """
+    legacy = []
+    for name, template in TEMPLATES.items():
+        if not es.indices.exists(index=name):
+            continue
+        expected = template['mappings']
+        for mappings in (body['mappings'] for body in es.indices.get_mapping(index=name).values()):
+            properties = mappings.get('properties', {})
+            mismatched = any(
+                field in properties and properties[field].get('type') != spec['type']
+                for field, spec in expected['properties'].items()
+            )
+            if mismatched or mappings.get('_routing', {}).get('required') != expected.get('_routing', {}).get('required'):
+                legacy.append(name)
+                break
+    return legacy
+
+def reindex(es, name):
+    """Copy an index into a new one built from the current template
+
+    Afterwards name is an alias for the new index. Video docs get their
+    routing set from user_id on the way through. The old indices are made
+    read-only for the copy so no write can land after it, and they are
+    only deleted once every doc made it across. Otherwise the new index is
+    dropped, the old ones are writable again and an exception is raised.
+    """
+    ensure_index_templates(es)
+
+    if es.indices.exists_alias(name=name):
+        old_indices = list(es.indices.get_alias(name=name).keys())
+    elif es.indices.exists(index=name):
+        old_indices = [name]
+    else:
+        old_indices = []
+
+    new_index = f"{name}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    es.indices.create(index=new_index)
+
+    copied = 0
+    if old_indices:
+        source = ','.join(old_indices)
+        script = None
+        if name == VIDEOS_INDEX:
+            script = {'source': 'ctx._routing = String.valueOf(ctx._source.user_id)'}
+        es.indices.put_settings(index=source, settings={'index.blocks.write': True})
+        try:
+            result = es.options(request_timeout=3600).reindex(
+                source={'index': source},
+                dest={'index': new_index},
+                script=script,
+                wait_for_completion=True,
+                refresh=True
+            )
+            if result.get('failures') or result.get('created', 0) != result.get('total', 0):
+                raise Exception(
+                    f"copied {result.get('created', 0)} of {result.get('total', 0)} docs, "
+                    f"failures: {result.get('failures')}"
+                )
+        except Exception as e:
+            es.indices.delete(index=new_index)
+            es.indices.put_settings(index=source, settings={'index.blocks.write': None})
+            raise Exception(f"Failed to reindex {name}, kept {source}: {str(e)}")
+        copied = result['created']
+
+    if old_indices == [name]:
+        # A concrete index has to go before an alias can take its name
+        es.indices.delete(index=name)
+        es.indices.put_alias(index=new_index, name=name)
+    else:
+        actions = [{'remove': {'index': index, 'alias': name}} for index in old_indices]
+        actions.append({'add': {'index': new_index, 'alias': name}})
+        es.indices.update_aliases(actions=actions)
+        for index in old_indices:
+            es.indices.delete(index=index)
+
+    return {'index': new_index, 'copied': copied, 'replaced': old_indices}
@@ -0,0 +1,301 @@
+import time
+import uuid
+import threading
+from psycopg2.extras import Json, execute_values
+from config.config import Config
+from services.database import db_connection
+from services.progress import ProgressPublisher
+from services.rate_limit import DownloadSlots
+from services.ytdlp_service import DownloadDeferred
+
+# Advisory lock id held while a worker claims a job
+CLAIM_LOCK_KEY = 7310001
+
+JOB_COLUMNS = 'id, user_id, batch_id, url, format_id, status, created_at, started_at, completed_at, error_message, result, slot_token'
+
+class DownloadJobQueue:
+    """Download jobs persisted in the download_queue table"""
+
+    def _execute(self, sql, params=(), fetch='one'):
+        """Run a single statement in its own transaction"""
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            if fetch == 'one':
+                rows = cur.fetchone()
+            elif fetch == 'all':
+                rows = cur.fetchall()
+            else:
+                rows = cur.rowcount
+            cur.close()
+            return rows
+
+    def enqueue(self, user_id, url, format_id=None, slot_token=None):
+        """Add a download job and return it"""
+        return self._execute(
+            f'''INSERT INTO download_queue (user_id, url, format_id, slot_token)
+            VALUES (%s, %s, %s, %s) RETURNING {JOB_COLUMNS}''',
+            (user_id, url, format_id, slot_token)
+        )
+
+    def enqueue_batch(self, user_id, urls, format_id=None, slot_tokens=None):
+        """Add one job per URL under a shared batch id, returns (batch_id, jobs)"""
+        batch_id = str(uuid.uuid4())
+        slot_tokens = slot_tokens or [None] * len(urls)
+        with db_connection() as conn:
+            cur = conn.cursor()
+            jobs = execute_values(
+                cur,
+                f'''INSERT INTO download_queue (user_id, batch_id, url, format_id, slot_token)
+                VALUES %s RETURNING {JOB_COLUMNS}''',
+                [(user_id, batch_id, url, format_id, token) for url, token in zip(urls, slot_tokens)],
+                fetch=True
+            )
+            cur.close()
+        return batch_id, sorted(jobs, key=lambda job: job['id'])
+
+    def get_batch(self, batch_id, user_id):
+        """Get every job in a batch owned by the given user"""
+        return self._execute(
+            f'SELECT {JOB_COLUMNS} FROM download_queue WHERE batch_id = %s AND user_id = %s ORDER BY id',
+            (batch_id, user_id),
+            fetch='all'
+        )
+
+    def get_job(self, job_id, user_id):
+        """Get a job owned by the given user"""
+        return self._execute(
+            f'SELECT {JOB_COLUMNS} FROM download_queue WHERE id = %s AND user_id = %s',
+            (job_id, user_id)
+        )
+
+    def has_active_jobs(self, user_id):
+        """Whether the user has any queued or running job"""
+        row = self._execute(
+            "SELECT EXISTS (SELECT 1 FROM download_queue WHERE user_id = %s AND status IN ('queued', 'running')) AS active",
+            (user_id,)
+        )
+        return row['active']
+
+    def claim_next_job(self):
+        """Mark the oldest runnable queued job as running and return it
+
+        Jobs are skipped until their run_after time, while their user
+        already has DOWNLOAD_PER_USER_CONCURRENCY jobs running, or while
+        DOWNLOAD_GLOBAL_CONCURRENCY jobs are running across all workers.
+        """
+        with db_connection() as conn:
+            cur = conn.cursor()
+            # Claims are serialized by a transaction level advisory lock so
+            # the running counts below always include every earlier claim.
+            # Under READ COMMITTED the UPDATE takes its snapshot after the
+            # lock is granted. SKIP LOCKED keeps jobs that are being
+            # finished or requeued from blocking the claim.
+            cur.execute('SELECT pg_advisory_xact_lock(%s)', (CLAIM_LOCK_KEY,))
+            cur.execute(f'''
+                UPDATE download_queue
+                SET status = 'running', started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT q.id FROM download_queue q
+                    WHERE q.status = 'queued'
+                    AND (q.run_after IS NULL OR q.run_after <= CURRENT_TIMESTAMP)
+                    AND (SELECT COUNT(*) FROM download_queue WHERE status = 'running') < %s
+                    AND (
+                        SELECT COUNT(*) FROM download_queue r
+                        WHERE r.status = 'running' AND r.user_id = q.user_id
+                    ) < %s
+                    ORDER BY q.id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING {JOB_COLUMNS}
+            ''', (Config.DOWNLOAD_GLOBAL_CONCURRENCY, Config.DOWNLOAD_PER_USER_CONCURRENCY))
+            job = cur.fetchone()
+            cur.close()
+            return job
+
+    def complete_job(self, job_id, result):
+        """Mark a job as completed and store its result"""
+        self._execute(
+            '''UPDATE download_queue
+               SET status = 'completed', completed_at = CURRENT_TIMESTAMP, result = %s
+               WHERE id = %s''',
+            (Json(result), job_id),
+            fetch=None
+        )
+
+    def fail_job(self, job_id, error_message):
+        """Mark a job as failed"""
+        self._execute(
+            '''UPDATE download_queue
+               SET status = 'failed', completed_at = CURRENT_TIMESTAMP, error_message = %s
+               WHERE id = %s''',
+            (error_message, job_id),
+            fetch=None
+        )
+
+    def heartbeat(self, job_ids):
+        """Extend the lease of jobs this worker is still running"""
+        if not job_ids:
+            return 0
+        return self._execute(
+            '''UPDATE download_queue SET heartbeat_at = CURRENT_TIMESTAMP
+               WHERE id = ANY(%s) AND status = 'running' ''',
+            (list(job_ids),),
+            fetch=None
+        )
+
+    def requeue_stale_jobs(self, lease_seconds):
+        """Put jobs whose worker stopped sending heartbeats back in the queue"""
+        return self._execute(
+            '''UPDATE download_queue
+               SET status = 'queued', started_at = NULL, heartbeat_at = NULL
+               WHERE status = 'running'
+               AND COALESCE(heartbeat_at, started_at) < CURRENT_TIMESTAMP - make_interval(secs => %s)''',
+            (lease_seconds,),
+            fetch=None
+        )
+
+    def defer_job(self, job_id, delay):
+        """Put a running job back in the queue to be claimed again after delay seconds"""
+        self._execute(
+            '''UPDATE download_queue
+               SET status = 'queued', started_at = NULL, heartbeat_at = NULL,
+                   run_after = CURRENT_TIMESTAMP + make_interval(secs => %s)
+               WHERE id = %s AND status = 'running' ''',
+            (delay, job_id),
+            fetch=None
+        )
+
+    def requeue_jobs(self, job_ids):
+        """Put jobs this worker gave up on back in the queue"""
+        if not job_ids:
+            return 0
+        return self._execute(
+            '''UPDATE download_queue
+               SET status = 'queued', started_at = NULL, heartbeat_at = NULL
+               WHERE id = ANY(%s) AND status = 'running' ''',
+            (list(job_ids),),
+            fetch=None
+        )
+
+def serialize_job(job):
+    """Convert a download_queue row to a JSON friendly dict"""
+    data = dict(job)
+    data.pop('slot_token', None)
+    for key in ('created_at', 'started_at', 'completed_at'):
+        if data.get(key):
+            data[key] = data[key].isoformat()
+    return data
+
+class DownloadWorker:
+    """Runs queued download jobs on a pool of threads
+
+    Running jobs hold a lease that a housekeeping thread renews every
+    DOWNLOAD_HEARTBEAT_INTERVAL. The same thread puts jobs whose lease ran
+    out, because their worker died, back in the queue.
+    """
+
+    def __init__(self, ytdlp_service, job_queue, concurrency=None, poll_interval=None):
+        self.ytdlp_service = ytdlp_service
+        self.job_queue = job_queue
+        self.concurrency = concurrency or Config.DOWNLOAD_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or Config.DOWNLOAD_POLL_INTERVAL
+        self._stop = threading.Event()
+        self._threads = []
+        self._slots = None
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads"""
+        self._requeue_stale()
+
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f'download-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._housekeeping, name='download-heartbeat', daemon=True).start()
+
+    def stop(self, timeout=None):
+        """Stop polling, wait up to timeout for running jobs, then requeue the rest"""
+        self._stop.set()
+        deadline = time.monotonic() + (timeout if timeout is not None else Config.DOWNLOAD_STOP_TIMEOUT)
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        with self._running_lock:
+            unfinished = list(self._running)
+        if unfinished:
+            try:
+                requeued = self.job_queue.requeue_jobs(unfinished)
+                print(f"Requeued {requeued} unfinished download jobs")
+            except Exception as e:
+                print(f"Error requeueing download jobs {unfinished}: {e}")
+
+    def _requeue_stale(self):
+        requeued = self.job_queue.requeue_stale_jobs(Config.DOWNLOAD_JOB_LEASE)
+        if requeued:
+            print(f"Requeued {requeued} stale download jobs")
+
+    def _housekeeping(self):
+        while not self._stop.wait(Config.DOWNLOAD_HEARTBEAT_INTERVAL):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                self.job_queue.heartbeat(running)
+                self._requeue_stale()
+            except Exception as e:
+                print(f"Job heartbeat error: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.job_queue.claim_next_job()
+            except Exception as e:
+                print(f"Job queue error: {e}")
+                job = None
+
+            if not job:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            with self._running_lock:
+                self._running.add(job['id'])
+            try:
+                self.run_job(job)
+            except Exception as e:
+                print(f"Error recording download job {job['id']}: {e}")
+            finally:
+                with self._running_lock:
+                    self._running.discard(job['id'])
+
+    def run_job(self, job):
+        """Run a single claimed job and record the outcome"""
+        progress = ProgressPublisher(self.ytdlp_service.redis_client, job['id'], job['user_id'])
+        try:
+            result = self.ytdlp_service.download_video(
+                job['url'], job['user_id'], job['format_id'], progress=progress
+            )
+        except DownloadDeferred as e:
+            # Keeps the user's slot, the job is still theirs
+            print(f"Download job {job['id']} deferred: {e}")
+            self.job_queue.defer_job(job['id'], Config.DOWNLOAD_DEDUP_RETRY_DELAY)
+            progress.phase('queued')
+            return
+        except Exception as e:
+            print(f"Download job {job['id']} failed: {e}")
+            self.job_queue.fail_job(job['id'], str(e))
+            self._release_slot(job)
+            progress.phase('failed', error=str(e))
+            return
+
+        self.job_queue.complete_job(job['id'], result)
+        self._release_slot(job)
+        progress.phase('completed', result=result)
+
+    def _release_slot(self, job):
+        """Give the user's download slot back once the job is finished"""
+        if self._slots is None:
+            self._slots = DownloadSlots(self.ytdlp_service.redis_client)
+        self._slots.release(job['user_id'], job.get('slot_token'))
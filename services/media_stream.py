@@ -0,0 +1,36 @@
+import hashlib
+from urllib.parse import urlsplit
+from config.config import Config
+
+def object_etag(object_name):
+    """ETag for a stored object
+
+    Objects are written once under a unique name and never changed, so the
+    name identifies the content.
+    """
+    return hashlib.sha1(object_name.encode('utf-8')).hexdigest()
+
+def iter_object(minio_client, bucket, object_name, offset=0, length=0, chunk_size=None):
+    """Yield an object, or length bytes of it from offset, in fixed-size chunks
+
+    Only one chunk is held in memory at a time. MinIO is not asked for the
+    object until the first chunk is wanted, so a response that is never
+    sent, such as the answer to a HEAD request, opens no connection.
+    """
+    response = minio_client.get_object(bucket, object_name, offset=offset, length=length)
+    try:
+        for chunk in response.stream(chunk_size or Config.STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        response.close()
+        response.release_conn()
+
+def accel_redirect_path(url, location=None):
+    """Internal nginx path that proxies a presigned MinIO URL
+
+    nginx forwards the client's Range header to MinIO itself, so the app
+    only has to authorize the request.
+    """
+    parts = urlsplit(url)
+    location = (location or Config.STREAM_ACCEL_REDIRECT).rstrip('/')
+    return f"{location}{parts.path}?{parts.query}"
@@ -0,0 +1,184 @@
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from elasticsearch import helpers
+from config.config import Config
+from services.es_schema import VIDEOS_INDEX
+from services.rate_limit import RateLimiter
+from services.video_info_cache import extract_youtube_id
+
+# Fields copied from a fresh extraction onto every doc of the video
+REFRESH_FIELDS = ('title', 'uploader', 'description', 'thumbnail', 'view_count', 'duration')
+
+class MetadataRefresher:
+    """Re-extracts the metadata of videos downloaded a while ago
+
+    Stale docs are grouped by YouTube id so a video kept by many users is
+    extracted once. Extractions run on a thread pool paced by a rate limit
+    shared by every worker, and only docs whose metadata changed are written
+    back, as partial updates in one bulk request. Videos found unchanged are
+    remembered in Redis so they are not extracted again until their
+    metadata is stale once more.
+    """
+
+    CHECKED_PREFIX = 'metadata_checked:'
+    PAGE_SIZE = 500
+
+    def __init__(self, es, redis_client, extract, dashboard_cache, max_age=None):
+        self.es = es
+        self.redis_client = redis_client
+        self.extract = extract
+        self.dashboard_cache = dashboard_cache
+        self.max_age = max_age or timedelta(hours=Config.METADATA_REFRESH_AGE_HOURS)
+        self.rate_limiter = RateLimiter(redis_client)
+
+    def run(self, max_videos=None):
+        """Refresh up to max_videos YouTube videos, returning counts and timing"""
+        stats = {'videos': 0, 'updated': 0, 'unchanged': 0, 'errors': 0}
+        started = time.perf_counter()
+        groups = self._stale_groups(max_videos or Config.METADATA_REFRESH_MAX_VIDEOS)
+        stats['videos'] = len(groups)
+
+        actions = []
+        user_ids = set()
+        now = datetime.now().isoformat()
+        with ThreadPoolExecutor(max_workers=Config.METADATA_REFRESH_CONCURRENCY) as executor:
+            urls = [hits[0]['_source']['url'] for hits in groups.values()]
+            for hits, info in zip(groups.values(), executor.map(self._extract, urls)):
+                if info is None:
+                    stats['errors'] += 1
+                    continue
+                for hit in hits:
+                    changes = {
+                        field: info[field] for field in REFRESH_FIELDS
+                        if info.get(field) is not None and hit['_source'].get(field) != info[field]
+                    }
+                    if not changes:
+                        stats['unchanged'] += 1
+                        continue
+                    changes['metadata_refreshed_at'] = now
+                    action = {
+                        '_op_type': 'update',
+                        '_index': hit['_index'],
+                        '_id': hit['_id'],
+                        'doc': changes,
+                        'retry_on_conflict': 3
+                    }
+                    # Docs indexed before routing by user_id have none
+                    if hit.get('_routing'):
+                        action['_routing'] = hit['_routing']
+                    actions.append(action)
+                    user_ids.add(str(hit['_source'].get('user_id', hit.get('_routing'))))
+
+        if actions:
+            updated, failures = helpers.bulk(self.es, actions, raise_on_error=False)
+            stats['updated'] += updated
+            stats['errors'] += len(failures)
+            self.dashboard_cache.invalidate(*user_ids)
+        self._mark_checked(groups)
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def _stale_groups(self, max_videos):
+        """Stale docs of up to max_videos YouTube videos, as {youtube_id: [hits]}
+
+        Docs are read in YouTube id order so the docs of one video arrive
+        together.
+        """
+        cutoff = (datetime.now() - self.max_age).isoformat()
+        query = {
+            "bool": {
+                "filter": [
+                    {"range": {"expiry_date": {"gt": datetime.now().isoformat()}}},
+                    {
+                        "bool": {
+                            "should": [
+                                {"range": {"metadata_refreshed_at": {"lt": cutoff}}},
+                                # Docs indexed before refreshes were tracked
+                                {
+                                    "bool": {
+                                        "must_not": {"exists": {"field": "metadata_refreshed_at"}},
+                                        "filter": {"range": {"download_date": {"lt": cutoff}}}
+                                    }
+                                }
+                            ],
+                            "minimum_should_match": 1
+                        }
+                    }
+                ]
+            }
+        }
+
+        groups = {}
+        pit_id = self.es.open_point_in_time(index=VIDEOS_INDEX, keep_alive='2m')['id']
+        try:
+            search_after = None
+            while len(groups) < max_videos:
+                body = {
+                    "query": query,
+                    "pit": {"id": pit_id, "keep_alive": "2m"},
+                    "sort": [{"youtube_id": "asc"}, {"_shard_doc": "asc"}],
+                    "_source": ["url", "youtube_id", "user_id", *REFRESH_FIELDS],
+                    "size": self.PAGE_SIZE
+                }
+                if search_after:
+                    body["search_after"] = search_after
+                result = self.es.search(body=body)
+                hits = result['hits']['hits']
+                if not hits:
+                    break
+                pit_id = result.get('pit_id', pit_id)
+                search_after = hits[-1]['sort']
+
+                page = {}
+                for hit in hits:
+                    source = hit['_source']
+                    youtube_id = source.get('youtube_id') or extract_youtube_id(source.get('url', ''))
+                    if youtube_id and source.get('url'):
+                        page.setdefault(youtube_id, []).append(hit)
+
+                new_ids = [youtube_id for youtube_id in page if youtube_id not in groups]
+                checked = []
+                if new_ids:
+                    checked = self.redis_client.mget([f"{self.CHECKED_PREFIX}{youtube_id}" for youtube_id in new_ids])
+                for youtube_id, hits_for_video in page.items():
+                    if youtube_id in groups:
+                        groups[youtube_id].extend(hits_for_video)
+                for youtube_id, seen in zip(new_ids, checked):
+                    if not seen and len(groups) < max_videos:
+                        groups[youtube_id] = page[youtube_id]
+        finally:
+            try:
+                self.es.close_point_in_time(id=pit_id)
+            except Exception:
+                pass
+        return groups
+
+    def _extract(self, url):
+        """Extract a video's metadata once the shared rate limit allows, or None on failure"""
+        while True:
+            wait = self.rate_limiter.hit(
+                'metadata_refresh', 'all',
+                Config.METADATA_REFRESH_PER_MINUTE, Config.METADATA_REFRESH_CONCURRENCY
+            )
+            if not wait:
+                break
+            time.sleep(wait)
+        try:
+            return self.extract(url)
+        except Exception as e:
+            print(f"Metadata refresh error for {url}: {e}")
+            return None
+
+    def _mark_checked(self, groups):
+        """Skip these videos until their metadata is stale again"""
+        if not groups:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for youtube_id in groups:
+                pipe.set(f"{self.CHECKED_PREFIX}{youtube_id}", 1, ex=int(self.max_age.total_seconds()))
+            pipe.execute()
+        except Exception as e:
+            print(f"Metadata refresh error: {e}")
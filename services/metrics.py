@@ -0,0 +1,103 @@
+import os
+import time
+import functools
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Every gunicorn worker writes its samples to PROMETHEUS_MULTIPROC_DIR when it
+# is set, /metrics then aggregates the files of all workers
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route',
+    ['method', 'endpoint', 'status'], buckets=LATENCY_BUCKETS
+)
+DOWNLOAD_STAGE_SECONDS = Histogram(
+    'download_stage_duration_seconds', 'Time spent in each stage of a video download',
+    ['stage'], buckets=STAGE_BUCKETS
+)
+DOWNLOADS = Counter('downloads_total', 'Finished video downloads', ['outcome'])
+DOWNLOAD_BYTES = Counter('download_bytes_total', 'Bytes downloaded from YouTube and stored')
+DEPENDENCY_SECONDS = Histogram(
+    'dependency_call_duration_seconds', 'Latency of calls to backing services',
+    ['service', 'operation'], buckets=LATENCY_BUCKETS
+)
+DEPENDENCY_ERRORS = Counter(
+    'dependency_call_errors_total', 'Calls to backing services that raised',
+    ['service', 'operation']
+)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups', ['cache', 'result'])
+POSTPROCESS_RUNS = Counter('postprocess_runs_total', 'ffmpeg post-processing runs', ['action', 'outcome'])
+POSTPROCESS_CPU_SECONDS = Counter(
+    'postprocess_cpu_seconds_total', 'CPU time used by ffmpeg post-processing', ['action']
+)
+POSTPROCESS_QUEUE_SECONDS = Histogram(
+    'postprocess_queue_duration_seconds', 'Time spent waiting for a free ffmpeg slot',
+    buckets=STAGE_BUCKETS
+)
+
+def cache_lookup(cache, hit):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+def observe_call(service, operation, started, failed=False):
+    """Record one call to a backing service that started at perf_counter() started"""
+    DEPENDENCY_SECONDS.labels(service, operation).observe(time.perf_counter() - started)
+    if failed:
+        DEPENDENCY_ERRORS.labels(service, operation).inc()
+
+class InstrumentedClient:
+    """Proxy that records the latency and errors of every method called on a client
+
+    Attributes named in namespaces (such as Elasticsearch's indices) are
+    wrapped as well, and so are methods returning a new client of the same
+    type, such as Elasticsearch's options().
+    """
+
+    def __init__(self, client, service, namespaces=(), prefix=''):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, '_service', service)
+        object.__setattr__(self, '_namespaces', namespaces)
+        object.__setattr__(self, '_prefix', prefix)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in self._namespaces:
+            return InstrumentedClient(attr, self._service, prefix=f'{self._prefix}{name}.')
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        operation = f'{self._prefix}{name}'
+        client_type = type(self._client)
+
+        @functools.wraps(attr)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception:
+                observe_call(self._service, operation, started, failed=True)
+                raise
+            observe_call(self._service, operation, started)
+            if type(result) is client_type:
+                return InstrumentedClient(result, self._service, self._namespaces, self._prefix)
+            return result
+        return timed
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
+
+def metrics_registry():
+    """Registry holding the samples of every process when running multi-process"""
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def render_metrics():
+    """Return (body, content type) in the Prometheus text format"""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
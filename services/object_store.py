@@ -0,0 +1,134 @@
+from datetime import datetime
+from collections import Counter
+from elasticsearch import ConflictError, NotFoundError, helpers
+from minio.deleteobjects import DeleteObject
+from config.config import Config
+from services.es_schema import OBJECTS_INDEX
+
+# Drops the reference document once the last user lets go of the object
+RELEASE_SCRIPT = """
+ctx._source.ref_count -= params.count;
+if (ctx._source.ref_count <= 0) {
+    ctx.op = 'delete';
+}
+"""
+
+ACQUIRE_SCRIPT = """
+ctx._source.ref_count += 1;
+ctx._source.last_used = params.now;
+"""
+
+# Optional artifacts stored next to the video and removed along with it
+SIDECAR_FIELDS = ('info_object_name', 'thumbnail_object_name')
+
+def stored_object_names(doc):
+    """Every MinIO object a video or object record points at"""
+    return [doc['object_name']] + [doc[field] for field in SIDECAR_FIELDS if doc.get(field)]
+
+class SharedObjectStore:
+    """Reference counted MinIO objects shared by every user who downloads the same video"""
+
+    def __init__(self, es, minio_client):
+        self.es = es
+        self.minio_client = minio_client
+
+    @staticmethod
+    def object_key(youtube_id, format_id):
+        """Key identifying one stored rendition of a video"""
+        return f"{youtube_id}:{format_id}"
+
+    def acquire(self, object_key):
+        """Take a reference on an existing object and return its record, or None"""
+        try:
+            result = self.es.update(
+                index=OBJECTS_INDEX,
+                id=object_key,
+                script={'source': ACQUIRE_SCRIPT, 'params': {'now': datetime.now().isoformat()}},
+                retry_on_conflict=5,
+                source=True
+            )
+        except NotFoundError:
+            return None
+        return result['get']['_source']
+
+    def register(self, object_key, object_name, file_name, file_size, sidecars=None):
+        """Record a freshly uploaded object with one reference
+
+        sidecars maps SIDECAR_FIELDS to the names of artifacts stored with it.
+        Returns False if another worker registered the same key first.
+        """
+        try:
+            self.es.index(
+                index=OBJECTS_INDEX,
+                id=object_key,
+                op_type='create',
+                document={
+                    'object_key': object_key,
+                    'object_name': object_name,
+                    'file_name': file_name,
+                    'file_size': file_size,
+                    'ref_count': 1,
+                    'created_at': datetime.now().isoformat(),
+                    'last_used': datetime.now().isoformat(),
+                    **(sidecars or {})
+                }
+            )
+        except ConflictError:
+            return False
+        return True
+
+    def release(self, object_key, object_names):
+        """Drop a reference and remove the objects from MinIO once none are left"""
+        return self.release_many([(object_key, object_names)]) > 0
+
+    def release_many(self, references):
+        """Drop a batch of (object_key, object_names) references
+
+        object_names lists the video object and its sidecars. Reference counts
+        are decremented with one bulk request and every object whose count
+        reached zero is removed in batched multi-object deletes. Videos stored
+        before deduplication have no object_key and own their objects
+        outright. Returns the number of objects removed.
+        """
+        counts = Counter()
+        names = {}
+        to_remove = []
+        for object_key, object_names in references:
+            if object_key:
+                counts[object_key] += 1
+                names[object_key] = object_names
+            else:
+                to_remove.extend(object_names)
+
+        actions = [
+            {
+                '_op_type': 'update',
+                '_index': OBJECTS_INDEX,
+                '_id': object_key,
+                'script': {'source': RELEASE_SCRIPT, 'params': {'count': count}},
+                'retry_on_conflict': 5
+            }
+            for object_key, count in counts.items()
+        ]
+        for ok, item in helpers.streaming_bulk(self.es, actions, raise_on_error=False):
+            result = item['update']
+            # A missing record means nothing else tracks the object
+            if result.get('result') == 'deleted' or result.get('status') == 404:
+                to_remove.extend(names[result['_id']])
+            elif not ok:
+                print(f"Error releasing object {result['_id']}: {result.get('error')}")
+
+        self.remove_objects(to_remove)
+        return len(to_remove)
+
+    def remove_objects(self, object_names):
+        """Remove objects from MinIO with multi-object delete requests"""
+        if not object_names:
+            return
+        errors = self.minio_client.remove_objects(
+            Config.MINIO_BUCKET,
+            (DeleteObject(name) for name in object_names)
+        )
+        # remove_objects is lazy, iterating the errors sends the requests
+        for error in errors:
+            print(f"Error removing object {error.name}: {error.message}")
@@ -0,0 +1,211 @@
+import os
+import time
+import struct
+import threading
+import subprocess
+from config.config import Config
+from services.metrics import POSTPROCESS_RUNS, POSTPROCESS_CPU_SECONDS, POSTPROCESS_QUEUE_SECONDS
+
+class FFmpegError(Exception):
+    """ffmpeg exited with an error or ran past its timeout"""
+
+class FFmpegPool:
+    """Runs ffmpeg with at most size processes at a time
+
+    Callers beyond the limit queue on a semaphore, so a burst of downloads
+    cannot oversubscribe the CPU. ffmpeg runs at a lower priority and its
+    CPU time is read from wait4 when it exits.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or Config.TRANSCODE_MAX_PROCESSES or os.cpu_count() or 1
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+
+    def run(self, args, timeout=None):
+        """Run ffmpeg with args, returning its queue wait, wall time and CPU time in seconds"""
+        queued = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+        wait_seconds = time.perf_counter() - queued
+        POSTPROCESS_QUEUE_SECONDS.observe(wait_seconds)
+        try:
+            started = time.perf_counter()
+            cpu_seconds = self._execute(args, timeout or Config.TRANSCODE_TIMEOUT)
+            return {
+                'wait_seconds': round(wait_seconds, 3),
+                'seconds': round(time.perf_counter() - started, 3),
+                'cpu_seconds': round(cpu_seconds, 3)
+            }
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    def _execute(self, args, timeout):
+        proc = subprocess.Popen(
+            [Config.FFMPEG_PATH, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        try:
+            os.setpriority(os.PRIO_PROCESS, proc.pid, Config.TRANSCODE_NICE)
+        except OSError:
+            pass
+
+        timed_out = threading.Event()
+        def kill():
+            timed_out.set()
+            proc.kill()
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            stderr = proc.stderr.read()
+            # wait4 instead of wait() to get the child's resource usage
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+            proc.stderr.close()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        if timed_out.is_set():
+            raise FFmpegError(f"ffmpeg timed out after {timeout}s")
+        if proc.returncode != 0:
+            raise FFmpegError(f"ffmpeg exited with {proc.returncode}: {stderr.decode(errors='replace').strip()[-500:]}")
+        return usage.ru_utime + usage.ru_stime
+
+    def stats(self):
+        """Current pool occupancy"""
+        with self._lock:
+            return {'size': self.size, 'active': self.active, 'waiting': self.waiting}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """This process's ffmpeg pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = FFmpegPool()
+    return _pool
+
+def is_faststart(path):
+    """Whether an MP4 file has its moov atom ahead of the media data"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return False
+            size, kind = struct.unpack('>I4s', header)
+            if kind == b'moov':
+                return True
+            if kind == b'mdat' or size == 0:
+                return False
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+                f.seek(size - 16, os.SEEK_CUR)
+            else:
+                f.seek(size - 8, os.SEEK_CUR)
+
+def bitrate_kbps(path, duration):
+    """Average bitrate of a file in kbit/s, or None without a duration"""
+    if not duration:
+        return None
+    return os.path.getsize(path) * 8 / duration / 1000
+
+def plan(path, duration, mode=None):
+    """Pick what to do with a downloaded file: None, 'remux' or 'transcode'
+
+    Files above TRANSCODE_TARGET_BITRATE are re-encoded in transcode mode.
+    Anything that is not already a faststart MP4 is remuxed.
+    """
+    mode = mode or Config.POSTPROCESS_MODE
+    if mode == 'off':
+        return None
+    if mode == 'transcode':
+        bitrate = bitrate_kbps(path, duration)
+        if bitrate and bitrate > Config.TRANSCODE_TARGET_BITRATE * 1.2:
+            return 'transcode'
+    if not path.endswith('.mp4') or not is_faststart(path):
+        return 'remux'
+    return None
+
+def remux_args(source, target):
+    """Copy the streams into an MP4 with the index at the front"""
+    return [
+        '-i', source,
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        target
+    ]
+
+def transcode_args(source, target):
+    """Re-encode to H.264/AAC at the target bitrate and height"""
+    bitrate = Config.TRANSCODE_TARGET_BITRATE
+    return [
+        '-i', source,
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', f"scale=-2:'min(ih,{Config.TRANSCODE_MAX_HEIGHT})'",
+        '-c:v', 'libx264', '-preset', Config.TRANSCODE_PRESET,
+        '-b:v', f'{bitrate}k', '-maxrate', f'{bitrate}k', '-bufsize', f'{bitrate * 2}k',
+        '-c:a', 'aac', '-b:a', f'{Config.TRANSCODE_AUDIO_BITRATE}k',
+        '-threads', str(Config.TRANSCODE_THREADS),
+        '-movflags', '+faststart',
+        target
+    ]
+
+def postprocess(path, duration, mode=None):
+    """Remux or transcode a downloaded file into a faststart MP4
+
+    Returns the path of the file to store and a report of what was done,
+    or None when the file is used as it is. When streams cannot be copied
+    into MP4 they are transcoded in transcode mode, while remux mode, which
+    promises no re-encoding, keeps the file as downloaded.
+    """
+    mode = mode or Config.POSTPROCESS_MODE
+    action = plan(path, duration, mode)
+    if action is None:
+        return path, None
+
+    target = os.path.splitext(path)[0] + '.mp4'
+    if target == path:
+        target = os.path.splitext(path)[0] + '.faststart.mp4'
+
+    report = {'action': action, 'input_size': os.path.getsize(path)}
+    try:
+        try:
+            args = transcode_args(path, target) if action == 'transcode' else remux_args(path, target)
+            report.update(get_pool().run(args))
+        except FFmpegError as e:
+            if action != 'remux':
+                raise
+            if mode != 'transcode':
+                POSTPROCESS_RUNS.labels(action, 'failed').inc()
+                if os.path.exists(target):
+                    os.remove(target)
+                print(f"Warning: remux of {os.path.basename(path)} failed, storing it as downloaded: {e}")
+                return path, None
+            print(f"Remux of {os.path.basename(path)} failed, transcoding instead: {e}")
+            report['action'] = action = 'transcode'
+            report.update(get_pool().run(transcode_args(path, target)))
+    except FFmpegError:
+        POSTPROCESS_RUNS.labels(action, 'failed').inc()
+        raise
+    POSTPROCESS_RUNS.labels(action, 'completed').inc()
+    POSTPROCESS_CPU_SECONDS.labels(action).inc(report['cpu_seconds'])
+
+    os.remove(path)
+    final_path = os.path.splitext(path)[0] + '.mp4'
+    if target != final_path:
+        os.replace(target, final_path)
+    report['output_size'] = os.path.getsize(final_path)
+    return final_path, report
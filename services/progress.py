@@ -0,0 +1,156 @@
+import json
+import time
+from config.config import Config
+
+JOB_CHANNEL_PREFIX = 'progress:job:'
+USER_CHANNEL_PREFIX = 'progress:user:'
+STATE_PREFIX = 'progress:state:'
+STATE_TTL = 3600
+TERMINAL_PHASES = ('completed', 'failed')
+# Sent to clients when a stream closes because there is nothing left to watch
+IDLE_PHASE = 'idle'
+
+class NullProgress:
+    """Progress reporter that discards everything"""
+
+    def phase(self, phase, **fields):
+        pass
+
+    def update(self, phase, **fields):
+        pass
+
+    def hook(self, status):
+        pass
+
+class ProgressPublisher:
+    """Publishes throttled progress events for a download job to Redis
+
+    Every event goes to the job's channel and its latest state is kept in a
+    key so late subscribers start from the current phase. Phase changes are
+    sent immediately, byte counts at most once per PROGRESS_INTERVAL.
+    Terminal events are also sent to the user's channel.
+    """
+
+    def __init__(self, redis_client, job_id, user_id, interval=None):
+        self.redis_client = redis_client
+        self.job_id = job_id
+        self.user_id = user_id
+        self.interval = interval or Config.PROGRESS_INTERVAL
+        self._last_publish = 0.0
+
+    def phase(self, phase, **fields):
+        """Publish a phase change"""
+        self._publish(dict(fields, phase=phase))
+
+    def update(self, phase, **fields):
+        """Publish a progress update, dropping it if one was sent too recently"""
+        now = time.monotonic()
+        if now - self._last_publish < self.interval:
+            return
+        self._publish(dict(fields, phase=phase))
+
+    def hook(self, status):
+        """yt-dlp progress hook"""
+        if status.get('status') == 'downloading':
+            self.update(
+                'downloading',
+                downloaded_bytes=status.get('downloaded_bytes'),
+                total_bytes=status.get('total_bytes') or status.get('total_bytes_estimate'),
+                speed=status.get('speed'),
+                eta=status.get('eta')
+            )
+        elif status.get('status') == 'finished':
+            self.phase('downloading', downloaded_bytes=status.get('downloaded_bytes'),
+                       total_bytes=status.get('total_bytes'), eta=0)
+
+    def _publish(self, event):
+        event['job_id'] = self.job_id
+        event['timestamp'] = time.time()
+        payload = json.dumps(event)
+        self._last_publish = time.monotonic()
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.set(f"{STATE_PREFIX}{self.job_id}", payload, ex=STATE_TTL)
+            pipe.publish(f"{JOB_CHANNEL_PREFIX}{self.job_id}", payload)
+            if event['phase'] in TERMINAL_PHASES:
+                pipe.publish(f"{USER_CHANNEL_PREFIX}{self.user_id}", payload)
+            pipe.execute()
+        except Exception as e:
+            print(f"Progress publish error: {e}")
+
+def format_sse(data):
+    """Format a payload as a Server-Sent Events message"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return f"data: {data}\n\n"
+
+def stream_events(redis_client, channel, initial=None, stop_on_terminal=True, timeout=None, keep_open=None):
+    """Yield SSE messages from a Redis channel
+
+    initial is a callable returning the current state to send first. It is
+    called after subscribing so no event can fall in between. Idle periods
+    get a keepalive comment, and the stream ends after a terminal event or
+    once timeout seconds have passed. keep_open is checked on every idle
+    period, and once it returns False an idle event ends the stream.
+    """
+    timeout = timeout or Config.SSE_MAX_DURATION
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(channel)
+    try:
+        state = initial() if initial else None
+        if state:
+            yield format_sse(state)
+            if stop_on_terminal and _is_terminal(state):
+                return
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=Config.SSE_KEEPALIVE)
+            if message is None:
+                if keep_open and not keep_open():
+                    yield format_sse(json.dumps({'phase': IDLE_PHASE}))
+                    return
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(message['data'])
+            if stop_on_terminal and _is_terminal(message['data']):
+                return
+    finally:
+        pubsub.close()
+
+def _is_terminal(payload):
+    return json.loads(payload).get('phase') in TERMINAL_PHASES
+
+def stream_job_events(redis_client, job):
+    """Yield SSE messages for a download job, starting from its current state"""
+    if job['status'] in TERMINAL_PHASES:
+        # Finished before the client connected, report the stored outcome
+        yield format_sse(json.dumps(job_outcome_event(job)))
+        return
+
+    def current_state():
+        state = redis_client.get(f"{STATE_PREFIX}{job['id']}")
+        return state or json.dumps({'job_id': job['id'], 'phase': job['status']})
+
+    yield from stream_events(redis_client, f"{JOB_CHANNEL_PREFIX}{job['id']}", initial=current_state)
+
+def stream_user_events(redis_client, user_id, has_active_jobs):
+    """Yield SSE messages for every job of a user that finishes
+
+    The stream ends with an idle event once has_active_jobs() is False, so
+    it does not hold a server thread while there is nothing to report.
+    """
+    if not has_active_jobs():
+        yield format_sse(json.dumps({'phase': IDLE_PHASE}))
+        return
+    yield from stream_events(redis_client, f"{USER_CHANNEL_PREFIX}{user_id}", stop_on_terminal=False,
+                             keep_open=has_active_jobs)
+
+def job_outcome_event(job):
+    """Terminal progress event for a finished download_queue row"""
+    event = {'job_id': job['id'], 'phase': job['status']}
+    if job['status'] == 'completed':
+        event['result'] = job['result']
+    else:
+        event['error'] = job['error_message']
+    return event
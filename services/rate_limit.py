@@ -0,0 +1,110 @@
+import math
+import uuid
+from config.config import Config
+
+# Refills the bucket for the time since the last call, then takes cost tokens
+# if there are enough. Returns 0 when allowed, else milliseconds until enough
+# tokens have accumulated.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+# Drops expired slots, then takes one slot per token if all of them fit.
+# Returns 1 when the slots were taken, else 0.
+ACQUIRE_SLOTS_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) + #ARGV - 2 > limit then
+    return 0
+end
+for i = 3, #ARGV do
+    redis.call('ZADD', KEYS[1], now + ttl, ARGV[i])
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+return 1
+"""
+
+class RateLimiter:
+    """Token bucket rate limits kept in Redis
+
+    Each (name, identity) pair has a bucket holding up to burst tokens that
+    refills at per_minute tokens a minute. Limits fail open if Redis is
+    unavailable.
+    """
+
+    KEY_PREFIX = 'rate_limit:'
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, name, identity, per_minute, burst, cost=1):
+        """Take cost tokens, returning 0 if allowed or the seconds to wait"""
+        try:
+            wait_ms = self._script(
+                keys=[f"{self.KEY_PREFIX}{name}:{identity}"],
+                args=[per_minute / 60.0, burst, cost]
+            )
+        except Exception as e:
+            print(f"Rate limiter error: {e}")
+            return 0
+        return math.ceil(int(wait_ms) / 1000)
+
+class DownloadSlots:
+    """Per-user semaphore on queued and running downloads kept in Redis
+
+    Every job holds a slot token from the moment it is queued until it
+    finishes. Slots expire after DOWNLOAD_SLOT_TTL seconds so a lost job
+    cannot hold one forever.
+    """
+
+    KEY_PREFIX = 'download_slots:'
+
+    def __init__(self, redis_client, limit=None, ttl=None):
+        self.redis_client = redis_client
+        self.limit = limit or Config.USER_MAX_ACTIVE_DOWNLOADS
+        self.ttl = ttl or Config.DOWNLOAD_SLOT_TTL
+        self._script = redis_client.register_script(ACQUIRE_SLOTS_SCRIPT)
+
+    def acquire(self, user_id, count=1):
+        """Take count slots, returning their tokens or None if they do not all fit"""
+        tokens = [str(uuid.uuid4()) for _ in range(count)]
+        try:
+            acquired = self._script(keys=[f"{self.KEY_PREFIX}{user_id}"], args=[self.limit, self.ttl, *tokens])
+        except Exception as e:
+            print(f"Download slot error: {e}")
+            return tokens
+        return tokens if acquired else None
+
+    def release(self, user_id, *tokens):
+        """Give slots back"""
+        tokens = [token for token in tokens if token]
+        if not tokens:
+            return
+        try:
+            self.redis_client.zrem(f"{self.KEY_PREFIX}{user_id}", *tokens)
+        except Exception as e:
+            print(f"Download slot error: {e}")
@@ -0,0 +1,60 @@
+from apscheduler.schedulers.background import BackgroundScheduler
+from config.config import Config
+
+def run_exclusive(redis_client, name, func, timeout):
+    """Run func unless another process is already running the same job"""
+    lock = redis_client.lock(f"scheduler_lock:{name}", timeout=timeout, blocking=False)
+    if not lock.acquire():
+        print(f"Skipping {name}, already running elsewhere")
+        return None
+    try:
+        return func()
+    finally:
+        try:
+            lock.release()
+        except Exception:
+            pass
+
+def create_scheduler(ytdlp_service):
+    """Build the scheduler for periodic maintenance jobs"""
+    scheduler = BackgroundScheduler()
+
+    def cleanup():
+        stats = run_exclusive(
+            ytdlp_service.redis_client,
+            'cleanup_expired_videos',
+            ytdlp_service.cleanup_expired_videos,
+            timeout=Config.CLEANUP_INTERVAL_MINUTES * 60
+        )
+        if stats:
+            print(f"Expired video cleanup: {stats}")
+
+    scheduler.add_job(
+        cleanup,
+        'interval',
+        minutes=Config.CLEANUP_INTERVAL_MINUTES,
+        id='cleanup_expired_videos',
+        max_instances=1,
+        coalesce=True
+    )
+
+    def refresh_metadata():
+        stats = run_exclusive(
+            ytdlp_service.redis_client,
+            'refresh_metadata',
+            ytdlp_service.refresh_metadata,
+            timeout=Config.METADATA_REFRESH_INTERVAL_MINUTES * 60
+        )
+        if stats:
+            print(f"Metadata refresh: {stats}")
+
+    if Config.METADATA_REFRESH_ENABLED:
+        scheduler.add_job(
+            refresh_metadata,
+            'interval',
+            minutes=Config.METADATA_REFRESH_INTERVAL_MINUTES,
+            id='refresh_metadata',
+            max_instances=1,
+            coalesce=True
+        )
+    return scheduler
@@ -0,0 +1,92 @@
+import sys
+import json
+import tempfile
+import subprocess
+
+class SizeLimitExceeded(Exception):
+    pass
+
+class LimitedReader:
+    """File-like wrapper that counts bytes read and fails once a limit is passed"""
+
+    def __init__(self, stream, limit, on_read=None):
+        self.stream = stream
+        self.limit = limit
+        self.on_read = on_read
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.limit:
+            raise SizeLimitExceeded(f"stream passed {self.limit} bytes")
+        if self.on_read:
+            self.on_read(self.bytes_read)
+        return data
+
+def is_streamable(fmt):
+    """Whether a format can be written to stdout without merging"""
+    return (
+        '+' not in fmt.get('format_id', '')
+        and fmt.get('protocol', 'https') in ('http', 'https', 'm3u8', 'm3u8_native')
+    )
+
+def stream_to_minio(minio_client, bucket, object_name, info, format_id, max_size, part_size,
+                    content_type='video/mp4', on_read=None, extra_args=()):
+    """Pipe a yt-dlp download straight into a MinIO multipart upload
+
+    yt-dlp runs in a child process reading the already-extracted info from
+    stdin and writing the media to stdout. Only one part is held in memory at
+    a time and the upload is aborted as soon as max_size bytes are passed.
+    on_read is called with the running byte count after every read and
+    extra_args are passed on to yt-dlp.
+    Returns the number of bytes uploaded.
+    """
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            [
+                sys.executable, '-m', 'yt_dlp',
+                '--load-info-json', '-',
+                '--format', format_id,
+                '--output', '-',
+                '--quiet', '--no-progress', '--no-part',
+                *extra_args,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr
+        )
+        reader = LimitedReader(proc.stdout, max_size, on_read)
+        try:
+            try:
+                proc.stdin.write(json.dumps(info).encode('utf-8'))
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+            minio_client.put_object(
+                bucket,
+                object_name,
+                reader,
+                length=-1,
+                part_size=part_size,
+                content_type=content_type,
+                num_parallel_uploads=1
+            )
+        except Exception:
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            proc.stdout.close()
+
+        if proc.wait() != 0:
+            try:
+                minio_client.remove_object(bucket, object_name)
+            except Exception:
+                pass
+            stderr.seek(0)
+            message = stderr.read().decode('utf-8', 'replace').strip().splitlines()
+            raise Exception(message[-1] if message else f"yt-dlp exited with {proc.returncode}")
+
+    return reader.bytes_read
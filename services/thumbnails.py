@@ -0,0 +1,33 @@
+import io
+import urllib3
+from PIL import Image
+from config.config import Config
+
+# Shared by every download thread so connections to the image CDN are reused
+http = urllib3.PoolManager(num_pools=4, maxsize=8, retries=urllib3.Retry(2, backoff_factor=0.5))
+
+def fetch_thumbnail(url, width=None, height=None, quality=None):
+    """Download an image and return it as a JPEG no larger than width x height"""
+    width = width or Config.THUMBNAIL_WIDTH
+    height = height or Config.THUMBNAIL_HEIGHT
+    response = http.request(
+        'GET', url,
+        timeout=Config.THUMBNAIL_FETCH_TIMEOUT,
+        preload_content=False
+    )
+    try:
+        if response.status != 200:
+            raise Exception(f"thumbnail request returned {response.status}")
+        data = response.read(Config.THUMBNAIL_MAX_SOURCE_SIZE + 1)
+        if len(data) > Config.THUMBNAIL_MAX_SOURCE_SIZE:
+            raise Exception("thumbnail source is too large")
+    finally:
+        response.release_conn()
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', (width, height))
+        image = image.convert('RGB')
+        image.thumbnail((width, height), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality or Config.THUMBNAIL_QUALITY, optimize=True)
+    return output.getvalue()
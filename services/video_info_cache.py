@@ -0,0 +1,156 @@
+import json
+import time
+import uuid
+import zlib
+import threading
+from urllib.parse import urlparse, parse_qs
+from config.config import Config
+from services.metrics import cache_lookup
+
+YOUTUBE_ID_LENGTH = 11
+
+def extract_youtube_id(url):
+    """Extract the canonical YouTube video id from a URL, or None"""
+    if '://' not in url:
+        url = f'https://{url}'
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    path_parts = [p for p in parsed.path.split('/') if p]
+
+    candidate = None
+    if host.endswith('youtu.be'):
+        candidate = path_parts[0] if path_parts else None
+    elif 'youtube' in host:
+        candidate = parse_qs(parsed.query).get('v', [None])[0]
+        if not candidate and len(path_parts) >= 2 and path_parts[0] in ('embed', 'v', 'shorts', 'live'):
+            candidate = path_parts[1]
+
+    if candidate and len(candidate) >= YOUTUBE_ID_LENGTH:
+        return candidate[:YOUTUBE_ID_LENGTH]
+    return None
+
+# Lua script that deletes a lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class VideoInfoCache:
+    """Redis cache of yt-dlp extraction results keyed by YouTube video id"""
+
+    KEY_PREFIX = 'video_info:'
+    LOCK_PREFIX = 'video_info_lock:'
+    STATS_KEY = 'video_info_cache:stats'
+    LOCK_STRIPES = 64
+
+    def __init__(self, redis_client, ttl=None, lock_timeout=None):
+        self.redis_client = redis_client
+        self.ttl = ttl or Config.VIDEO_INFO_CACHE_TTL
+        self.lock_timeout = lock_timeout or Config.VIDEO_INFO_LOCK_TIMEOUT
+        # Striped locks collapse concurrent misses inside one process
+        # before they reach the Redis lock
+        self._local_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def get(self, video_id):
+        """Get cached info for a video id, or None"""
+        try:
+            raw = self.redis_client.get(self.KEY_PREFIX + video_id)
+        except Exception as e:
+            print(f"Video info cache read error: {e}")
+            return None
+        if raw is None:
+            return None
+        return json.loads(zlib.decompress(raw))
+
+    def set(self, video_id, info):
+        """Store info for a video id"""
+        try:
+            payload = zlib.compress(json.dumps(info).encode('utf-8'), 1)
+            self.redis_client.set(self.KEY_PREFIX + video_id, payload, ex=self.ttl)
+        except Exception as e:
+            print(f"Video info cache write error: {e}")
+
+    def get_or_extract(self, video_id, extract):
+        """Return cached info, running extract() at most once across workers on a miss"""
+        info = self.get(video_id)
+        if info is not None:
+            self._count('hits')
+            return info
+
+        with self._local_locks[hash(video_id) % self.LOCK_STRIPES]:
+            info = self.get(video_id)
+            if info is not None:
+                self._count('hits')
+                return info
+
+            lock_key = self.LOCK_PREFIX + video_id
+            token = str(uuid.uuid4())
+            try:
+                acquired = self.redis_client.set(lock_key, token, nx=True, ex=self.lock_timeout)
+            except Exception as e:
+                print(f"Video info cache lock error: {e}")
+                acquired = None
+
+            if acquired:
+                try:
+                    return self._extract_and_store(video_id, extract)
+                finally:
+                    self._release_lock(lock_key, token)
+
+            # Another worker is extracting the same video, wait for its result
+            info = self._wait_for_result(video_id, lock_key)
+            if info is not None:
+                self._count('hits')
+                return info
+            return self._extract_and_store(video_id, extract)
+
+    def stats(self):
+        """Get hit/miss counters"""
+        try:
+            counters = self.redis_client.hgetall(self.STATS_KEY)
+        except Exception as e:
+            print(f"Video info cache stats error: {e}")
+            counters = {}
+        hits = int(counters.get(b'hits', 0))
+        misses = int(counters.get(b'misses', 0))
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0
+        }
+
+    def _extract_and_store(self, video_id, extract):
+        self._count('misses')
+        info = extract()
+        self.set(video_id, info)
+        return info
+
+    def _wait_for_result(self, video_id, lock_key):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            info = self.get(video_id)
+            if info is not None:
+                return info
+            try:
+                if not self.redis_client.exists(lock_key):
+                    return self.get(video_id)
+            except Exception:
+                return None
+        return None
+
+    def _release_lock(self, lock_key, token):
+        try:
+            self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"Video info cache unlock error: {e}")
+
+    def _count(self, field):
+        cache_lookup('video_info', field == 'hits')
+        try:
+            self.redis_client.hincrby(self.STATS_KEY, field, 1)
+        except Exception:
+            pass
@@ -1,43 +1,136 @@
+import io
 import os
+import copy
+import mimetypes
+import json
+import base64
+import time
 import uuid
 import tempfile
 from datetime import datetime, timedelta
-from minio import Minio
-from elasticsearch import Elasticsearch
-import redis
+from elasticsearch import helpers
+from redis.exceptions import LockError
 import yt_dlp
 from config.config import Config
+from services.clients import get_minio, get_elasticsearch, get_redis
+from services.video_info_cache import VideoInfoCache, extract_youtube_id
+from services.dashboard_cache import DashboardCache
+from services.download_url_cache import DownloadUrlCache
+from services.es_schema import VIDEOS_INDEX, ensure_index_templates, ensure_added_fields, legacy_indices, reindex
+from services.object_store import SharedObjectStore, SIDECAR_FIELDS, stored_object_names
+from services.streaming_upload import stream_to_minio, is_streamable, SizeLimitExceeded
+from services.progress import NullProgress
+from services.download_profile import download_options, download_cli_args, ThroughputStats
+from services.thumbnails import fetch_thumbnail
+from services.media_stream import object_etag
+from services.metrics import DOWNLOAD_STAGE_SECONDS, DOWNLOADS, DOWNLOAD_BYTES
+from services.postprocess import postprocess, FFmpegError
+from services.metadata_refresh import MetadataRefresher
+
+class DownloadDeferred(Exception):
+    """The download has to wait for another job and should be run again later"""
+
+def guess_content_type(path):
+    """Content type to store a file under, from its extension"""
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+def encode_cursor(direction, sort_values):
+    """Build an opaque pagination cursor"""
+    payload = json.dumps({'d': direction, 's': sort_values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (direction, search_after) for a cursor, starting from the top if it is missing or invalid"""
+    if not cursor:
+        return 'after', None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload['d'] in ('after', 'before') and isinstance(payload['s'], list):
+            return payload['d'], payload['s']
+    except (ValueError, KeyError, TypeError):
+        pass
+    return 'after', None
 
 class YTDLPService:
+    """Downloads, storage and search for videos
+    
+    Constructing the service does no I/O. Clients and the helpers built on
+    them are created per process on first use, so the service can be
+    created before gunicorn forks its workers. The bucket and index
+    templates are created by `python manage.py migrate`.
+    """
+    
     def __init__(self):
-        # Initialize MinIO client
-        self.minio_client = Minio(
-            Config.MINIO_ENDPOINT,
-            access_key=Config.MINIO_ACCESS_KEY,
-            secret_key=Config.MINIO_SECRET_KEY,
-            secure=Config.MINIO_SECURE
-        )
-        
-        # Initialize Elasticsearch
-        self.es = Elasticsearch([Config.ELASTICSEARCH_URL])
-        
-        # Initialize Redis
-        self.redis_client = redis.from_url(Config.REDIS_URL)
-        
-        # Ensure bucket exists
-        self._ensure_bucket_exists()
+        self._components = {}
+        self._components_pid = os.getpid()
     
-    def _ensure_bucket_exists(self):
-        """Ensure MinIO bucket exists"""
-        try:
-            if not self.minio_client.bucket_exists(Config.MINIO_BUCKET):
-                self.minio_client.make_bucket(Config.MINIO_BUCKET)
-        except Exception as e:
-            print(f"Error creating bucket: {e}")
+    def _component(self, name, factory):
+        """Get a helper for this process, building it on first use"""
+        if self._components_pid != os.getpid():
+            self._components = {}
+            self._components_pid = os.getpid()
+        component = self._components.get(name)
+        if component is None:
+            component = self._components.setdefault(name, factory())
+        return component
     
-    def get_video_info(self, url):
-        """Extract video information without downloading"""
-        try:
+    @property
+    def minio_client(self):
+        return get_minio()
+    
+    @property
+    def es(self):
+        return get_elasticsearch()
+    
+    @property
+    def redis_client(self):
+        return get_redis()
+    
+    @property
+    def video_info_cache(self):
+        return self._component('video_info_cache', lambda: VideoInfoCache(self.redis_client))
+    
+    @property
+    def dashboard_cache(self):
+        return self._component('dashboard_cache', lambda: DashboardCache(self.redis_client))
+    
+    @property
+    def download_url_cache(self):
+        return self._component('download_url_cache', lambda: DownloadUrlCache(self.redis_client))
+    
+    @property
+    def throughput(self):
+        return self._component('throughput', lambda: ThroughputStats(self.redis_client))
+    
+    @property
+    def object_store(self):
+        # Reference counted storage shared between users
+        return self._component('object_store', lambda: SharedObjectStore(self.es, self.minio_client))
+    
+    @property
+    def metadata_refresher(self):
+        return self._component('metadata_refresher', lambda: MetadataRefresher(
+            self.es, self.redis_client, self._extract_info, self.dashboard_cache
+        ))
+    
+    def migrate(self):
+        """Create the MinIO bucket and install the Elasticsearch index templates
+        
+        Indices created before the templates existed are rebuilt from them,
+        since their dynamic mappings cannot be sorted on. Returns the
+        reindex results.
+        """
+        if not self.minio_client.bucket_exists(Config.MINIO_BUCKET):
+            self.minio_client.make_bucket(Config.MINIO_BUCKET)
+        ensure_index_templates(self.es)
+        reindexed = [reindex(self.es, name) for name in legacy_indices(self.es)]
+        ensure_added_fields(self.es)
+        return reindexed
+    
+    def _extract_info(self, url):
+        """Run yt-dlp extraction, shared through the cache by YouTube video id"""
+        def extract():
             ydl_opts = {
                 'quiet': True,
                 'no_download': True,
@@ -45,70 +138,367 @@ class YTDLPService:
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
-                
-            return {
-                'title': info.get('title', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'uploader': info.get('uploader', 'Unknown'),
-                'upload_date': info.get('upload_date', ''),
-                'description': info.get('description', ''),
-                'thumbnail': info.get('thumbnail', ''),
-                'view_count': info.get('view_count', 0),
-                'formats': [f for f in info.get('formats', []) if f.get('ext') in Config.ALLOWED_FORMATS]
+                return ydl.sanitize_info(info)
+        
+        youtube_id = extract_youtube_id(url)
+        if not youtube_id:
+            return extract()
+        return self.video_info_cache.get_or_extract(youtube_id, extract)
+    
+    def expand_playlist(self, url, limit=None):
+        """List the video URLs in a playlist without extracting each video"""
+        try:
+            ydl_opts = {
+                'quiet': True,
+                'extract_flat': 'in_playlist',
+                'playlistend': limit or Config.BATCH_MAX_ITEMS,
+                # Runs in a web request, so a slow playlist page must not hold the thread
+                'socket_timeout': Config.PLAYLIST_EXPAND_TIMEOUT,
             }
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+            
+            entries = info.get('entries') or []
+            return [
+                f"https://www.youtube.com/watch?v={entry['id']}"
+                for entry in entries if entry and entry.get('id')
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to expand playlist: {str(e)}")
+    
+    def _summarize_info(self, info):
+        """Reduce a yt-dlp info dict to the fields the app uses"""
+        return {
+            'title': info.get('title', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'uploader': info.get('uploader', 'Unknown'),
+            'upload_date': info.get('upload_date', ''),
+            'description': info.get('description', ''),
+            'thumbnail': info.get('thumbnail', ''),
+            'view_count': info.get('view_count', 0),
+            'formats': [f for f in info.get('formats', []) if f.get('ext') in Config.ALLOWED_FORMATS]
+        }
+    
+    def get_video_info(self, url):
+        """Extract video information without downloading"""
+        try:
+            return self._summarize_info(self._extract_info(url))
         except Exception as e:
             raise Exception(f"Failed to extract video info: {str(e)}")
     
-    def download_video(self, url, user_id, format_id=None):
-        """Download video and store in MinIO"""
+    def get_cached_info(self, url):
+        """Get raw info from the extraction cache without extracting, or None"""
+        youtube_id = extract_youtube_id(url)
+        if not youtube_id:
+            return None
+        return self.video_info_cache.get(youtube_id)
+    
+    def available_format_ids(self, info):
+        """Format ids users may request for a video"""
+        return [f['format_id'] for f in self._summarize_info(info)['formats']]
+    
+    def estimate_download_size(self, info, format_id=None):
+        """Predict the output size in bytes from format metadata, or None if unknown"""
+        fmt = self._select_format(info, format_id)
+        if not fmt:
+            return None
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and fmt.get('tbr') and info.get('duration'):
+            # tbr is the total bitrate in KBit/s
+            size = fmt['tbr'] * 1000 / 8 * info['duration']
+        return int(size) if size else None
+    
+    def _select_format(self, info, format_id=None):
+        """Pick the format yt-dlp will download for format_id, or None"""
+        formats = info.get('formats') or []
+        if format_id:
+            return next((f for f in formats if f.get('format_id') == format_id), None)
+        
+        # Same choice as the default 'best[ext=mp4]/best' selector,
+        # yt-dlp orders formats from worst to best
+        progressive = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
+        candidates = [f for f in progressive if f.get('ext') == 'mp4'] or progressive
+        return candidates[-1] if candidates else None
+    
+    def _store_video(self, url, info, object_prefix, video_id, format_id, selected_format, temp_dir, timings,
+                     progress):
+        """Download the video and upload it under object_prefix in MinIO
+        
+        Returns the file name, size, object name and a dict of uploaded
+        sidecar object names. Streamed uploads never touch disk and are
+        stored as yt-dlp produces them, without post-processing. If any
+        step fails, whatever was already uploaded under object_prefix is
+        removed, since nothing else points at it yet.
+        """
+        try:
+            if Config.STREAMING_UPLOAD and selected_format and is_streamable(selected_format):
+                stored = self._stream_and_upload(info, object_prefix, video_id, selected_format, temp_dir,
+                                                 timings, progress)
+            else:
+                stored = self._download_and_upload(url, info, object_prefix, video_id, format_id, temp_dir,
+                                                   timings, progress)
+            
+            video_file, file_size, object_name, sidecars = stored
+            thumbnail_object_name = self._store_thumbnail(info, object_prefix, video_id, timings)
+            if thumbnail_object_name:
+                sidecars['thumbnail_object_name'] = thumbnail_object_name
+            return video_file, file_size, object_name, sidecars
+        except Exception:
+            self._remove_uploaded(object_prefix)
+            raise
+    
+    def _remove_uploaded(self, object_prefix):
+        """Remove every object under a download's prefix, which is unique to it"""
+        try:
+            objects = self.minio_client.list_objects(Config.MINIO_BUCKET, prefix=f"{object_prefix}/",
+                                                     recursive=True)
+            self.object_store.remove_objects([obj.object_name for obj in objects])
+        except Exception as e:
+            print(f"Error removing partial upload {object_prefix}: {e}")
+    
+    def _stream_and_upload(self, info, object_prefix, video_id, selected_format, temp_dir, timings, progress):
+        """Pipe yt-dlp output straight into MinIO without touching local disk"""
+        video_file = f"{video_id}.{selected_format.get('ext', 'mp4')}"
+        object_name = f"{object_prefix}/{video_file}"
+        
+        total_bytes = selected_format.get('filesize') or selected_format.get('filesize_approx')
+        progress.phase('uploading', downloaded_bytes=0, total_bytes=total_bytes)
+        started = time.perf_counter()
+        try:
+            file_size = stream_to_minio(
+                self.minio_client,
+                Config.MINIO_BUCKET,
+                object_name,
+                info,
+                selected_format['format_id'],
+                Config.MAX_VIDEO_SIZE * 1024 * 1024,
+                Config.STREAM_UPLOAD_PART_SIZE * 1024 * 1024,
+                content_type=guess_content_type(video_file),
+                on_read=lambda read: progress.update('uploading', downloaded_bytes=read,
+                                                     total_bytes=total_bytes),
+                extra_args=download_cli_args()
+            )
+        except SizeLimitExceeded:
+            raise Exception(f"Video size exceeds {Config.MAX_VIDEO_SIZE}MB limit")
+        timings['stream'] = round(time.perf_counter() - started, 3)
+        self.throughput.record(selected_format['format_id'], file_size, timings['stream'])
+        
+        sidecars = {}
+        if Config.DOWNLOAD_SIDECARS == 'upload':
+            # Nothing is on disk here, write the info we already hold
+            info_path = os.path.join(temp_dir, f"{video_id}.info.json")
+            with open(info_path, 'w') as f:
+                json.dump(info, f)
+            sidecars = self._upload_sidecars(object_prefix, info_object_name=info_path)
+        return video_file, file_size, object_name, sidecars
+    
+    def _download_and_upload(self, url, info, object_prefix, video_id, format_id, temp_dir, timings, progress):
+        """Download into temp_dir, then upload the file to MinIO"""
+        # Configure yt-dlp options
+        ydl_opts = {
+            'outtmpl': os.path.join(temp_dir, f'{video_id}.%(ext)s'),
+            'format': format_id if format_id else 'best[ext=mp4]/best',
+            'writeinfojson': Config.DOWNLOAD_SIDECARS == 'upload',
+            'writethumbnail': False,
+            # Abort mid-stream if the size estimate turns out to be wrong
+            'max_filesize': Config.MAX_VIDEO_SIZE * 1024 * 1024,
+            'progress_hooks': [progress.hook],
+            **download_options(),
+        }
+        if Config.POSTPROCESS_MODE != 'off':
+            # Merged video and audio formats land in the container we serve
+            ydl_opts['merge_output_format'] = 'mp4'
+        
+        # Download video from the extracted info instead of resolving the page again
+        progress.phase('downloading')
+        started = time.perf_counter()
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            try:
+                result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+            except yt_dlp.utils.DownloadError:
+                # Stream URLs in cached info can expire, fall back to a fresh extraction
+                result = ydl.extract_info(url, download=True)
+        timings['download'] = round(time.perf_counter() - started, 3)
+        
+        # yt-dlp reports the final path of the merged or converted file
+        downloads = (result or {}).get('requested_downloads') or [{}]
+        video_path = downloads[0].get('filepath')
+        if not video_path or not os.path.exists(video_path):
+            # yt-dlp skips the file without raising when max_filesize is hit
+            raise Exception(f"No video file found after download, it may exceed the {Config.MAX_VIDEO_SIZE}MB limit")
+        
+        video_file = os.path.basename(video_path)
+        if os.path.splitext(video_file)[1].lstrip('.') not in Config.ALLOWED_FORMATS:
+            raise Exception(f"Unsupported video format: {video_file}")
+        
+        file_size = os.path.getsize(video_path)
+        
+        # Check file size limit
+        if file_size > Config.MAX_VIDEO_SIZE * 1024 * 1024:
+            raise Exception(f"Video size exceeds {Config.MAX_VIDEO_SIZE}MB limit")
+        
+        self.throughput.record((result or {}).get('format_id') or format_id, file_size, timings['download'])
+        
+        # Remux or transcode into a faststart MP4 for instant playback and range reads
+        progress.phase('processing')
+        try:
+            video_path, report = postprocess(video_path, info.get('duration'))
+        except FFmpegError as e:
+            raise Exception(f"Post-processing failed: {str(e)}")
+        if report:
+            timings['postprocess_wait'] = report['wait_seconds']
+            timings['postprocess'] = report['seconds']
+            video_file = os.path.basename(video_path)
+            file_size = report['output_size']
+        
+        # Upload to MinIO
+        object_name = f"{object_prefix}/{video_file}"
+        
+        progress.phase('uploading', total_bytes=file_size)
+        started = time.perf_counter()
+        self.minio_client.fput_object(
+            Config.MINIO_BUCKET,
+            object_name,
+            video_path,
+            content_type=guess_content_type(video_path)
+        )
+        timings['upload'] = round(time.perf_counter() - started, 3)
+        
+        sidecars = {}
+        if Config.DOWNLOAD_SIDECARS == 'upload':
+            sidecars = self._upload_sidecars(object_prefix, info_object_name=downloads[0].get('infojson_filename'))
+        
+        return video_file, file_size, object_name, sidecars
+    
+    def _upload_sidecars(self, object_prefix, **paths):
+        """Upload sidecar files next to the video, keyed by their SIDECAR_FIELDS name"""
+        sidecars = {}
+        for field, path in paths.items():
+            if not path or not os.path.exists(path):
+                continue
+            object_name = f"{object_prefix}/{os.path.basename(path)}"
+            self.minio_client.fput_object(
+                Config.MINIO_BUCKET,
+                object_name,
+                path,
+                content_type=guess_content_type(path)
+            )
+            sidecars[field] = object_name
+        return sidecars
+    
+    def _store_thumbnail(self, info, object_prefix, video_id, timings):
+        """Fetch, resize and store the video's thumbnail, returning its object name
+        
+        A missing thumbnail never fails the download.
+        """
+        if not Config.THUMBNAIL_ENABLED or not info.get('thumbnail'):
+            return None
+        started = time.perf_counter()
+        try:
+            data = fetch_thumbnail(info['thumbnail'])
+            object_name = f"{object_prefix}/{video_id}.thumb.jpg"
+            self.minio_client.put_object(
+                Config.MINIO_BUCKET,
+                object_name,
+                io.BytesIO(data),
+                length=len(data),
+                content_type='image/jpeg'
+            )
+        except Exception as e:
+            print(f"Thumbnail error for {video_id}: {e}")
+            return None
+        timings['thumbnail'] = round(time.perf_counter() - started, 3)
+        return object_name
+    
+    def download_video(self, url, user_id, format_id=None, info=None, progress=None):
+        """Download video and store in MinIO
+        
+        If the caller already has the raw yt-dlp info dict for the URL it can
+        pass it as info, otherwise it is taken from the extraction cache.
+        Phase changes and byte counts are reported to progress when given.
+        """
+        progress = progress or NullProgress()
+        timings = {}
+        shared = None
+        object_key = None
+        object_name = None
+        sidecars = {}
+        # Whether a failure has to give back the stored object, and the key
+        # of the object record holding its reference, if there is one
+        object_owned = False
+        owned_key = None
         try:
             # Generate unique filename
             video_id = str(uuid.uuid4())
             temp_dir = tempfile.mkdtemp()
             
             # Get video info first
-            video_info = self.get_video_info(url)
-            
-            # Configure yt-dlp options
-            ydl_opts = {
-                'outtmpl': os.path.join(temp_dir, f'{video_id}.%(ext)s'),
-                'format': format_id if format_id else 'best[ext=mp4]/best',
-                'writeinfojson': True,
-                'writethumbnail': True,
-            }
-            
-            # Download video
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            
-            # Find downloaded files
-            downloaded_files = os.listdir(temp_dir)
-            video_file = None
-            
-            for file in downloaded_files:
-                if any(file.endswith(f'.{ext}') for ext in Config.ALLOWED_FORMATS):
-                    video_file = file
-                    break
-            
-            if not video_file:
-                raise Exception("No video file found after download")
-            
-            video_path = os.path.join(temp_dir, video_file)
-            file_size = os.path.getsize(video_path)
+            progress.phase('extracting')
+            started = time.perf_counter()
+            if info is None:
+                info = self._extract_info(url)
+            video_info = self._summarize_info(info)
+            timings['extract'] = round(time.perf_counter() - started, 3)
+
+            if format_id and format_id not in self.available_format_ids(info):
+                raise Exception("Requested format is not available")
             
-            # Check file size limit
-            if file_size > Config.MAX_VIDEO_SIZE * 1024 * 1024:
+            # Reject before any bandwidth is spent when the metadata says it is too big
+            max_bytes = Config.MAX_VIDEO_SIZE * 1024 * 1024
+            estimated_size = self.estimate_download_size(info, format_id)
+            if estimated_size and estimated_size > max_bytes:
                 raise Exception(f"Video size exceeds {Config.MAX_VIDEO_SIZE}MB limit")
             
-            # Upload to MinIO
-            object_name = f"{user_id}/{video_id}/{video_file}"
+            selected_format = self._select_format(info, format_id)
+            youtube_id = extract_youtube_id(url)
+            if youtube_id and selected_format:
+                object_key = SharedObjectStore.object_key(youtube_id, format_id or selected_format['format_id'])
             
-            self.minio_client.fput_object(
-                Config.MINIO_BUCKET,
-                object_name,
-                video_path,
-                content_type='video/mp4'
-            )
+            if object_key:
+                # Everyone asking for the same rendition shares one object, the lock
+                # keeps concurrent jobs from downloading it twice
+                lock = self.redis_client.lock(f"video_object_lock:{object_key}",
+                                              timeout=Config.DOWNLOAD_JOB_TIMEOUT,
+                                              blocking_timeout=Config.DOWNLOAD_DEDUP_LOCK_WAIT)
+                if not lock.acquire():
+                    # Another job is storing this rendition, run again once it is done
+                    # instead of holding a worker thread while it downloads
+                    raise DownloadDeferred(f"{object_key} is being downloaded by another job")
+                try:
+                    shared = self.object_store.acquire(object_key)
+                    if shared:
+                        video_file = shared['file_name']
+                        file_size = shared['file_size']
+                        object_name = shared['object_name']
+                        sidecars = {field: shared[field] for field in SIDECAR_FIELDS if shared.get(field)}
+                        object_owned = True
+                        owned_key = object_key
+                    else:
+                        video_file, file_size, object_name, sidecars = self._store_video(
+                            url, info, f"shared/{youtube_id}/{video_id}", video_id,
+                            format_id, selected_format, temp_dir, timings, progress
+                        )
+                        # Owned outright until its object record exists
+                        object_owned = True
+                        if self.object_store.register(object_key, object_name, video_file, file_size,
+                                                      sidecars):
+                            owned_key = object_key
+                        else:
+                            # Lost a race despite the lock, keep this copy private
+                            object_key = None
+                finally:
+                    try:
+                        lock.release()
+                    except LockError:
+                        # Expired while the download ran, another job may hold it now
+                        pass
+            else:
+                video_file, file_size, object_name, sidecars = self._store_video(
+                    url, info, f"{user_id}/{video_id}", video_id,
+                    format_id, selected_format, temp_dir, timings, progress
+                )
+                object_owned = True
             
             # Store metadata in Elasticsearch
             metadata = {
@@ -125,30 +515,63 @@ class YTDLPService:
                 'file_name': video_file,
                 'file_size': file_size,
                 'download_date': datetime.now().isoformat(),
+                'metadata_refreshed_at': datetime.now().isoformat(),
                 'expiry_date': (datetime.now() + timedelta(days=Config.VIDEO_EXPIRY_DAYS)).isoformat(),
                 'object_name': object_name,
+                **sidecars,
+                'object_key': object_key,
+                'youtube_id': youtube_id,
+                'format_id': format_id or (selected_format or {}).get('format_id'),
                 'status': 'completed'
             }
             
+            progress.phase('indexing')
+            started = time.perf_counter()
             self.es.index(
-                index='video_downloads',
+                index=VIDEOS_INDEX,
                 id=video_id,
-                body=metadata
+                routing=str(user_id),
+                body=metadata,
+                refresh='wait_for'
             )
+            timings['index'] = round(time.perf_counter() - started, 3)
+            self.dashboard_cache.invalidate(user_id)
             
             # Clean up temp files
             import shutil
             shutil.rmtree(temp_dir)
             
+            for stage, seconds in timings.items():
+                DOWNLOAD_STAGE_SECONDS.labels(stage).observe(seconds)
+            if shared is None:
+                DOWNLOAD_BYTES.inc(file_size)
+            DOWNLOADS.labels('deduplicated' if shared else 'completed').inc()
+            
             return {
                 'video_id': video_id,
                 'title': video_info['title'],
                 'file_name': video_file,
                 'file_size': file_size,
-                'download_url': f"/download/{video_id}"
+                'download_url': f"/download/{video_id}",
+                'deduplicated': shared is not None,
+                'timings': timings
             }
             
+        except DownloadDeferred:
+            # Not a failure, the queue runs the job again later
+            import shutil
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
         except Exception as e:
+            DOWNLOADS.labels('failed').inc()
+            
+            # Give back the stored object if the metadata never made it to the index
+            if object_owned:
+                try:
+                    self.object_store.release(owned_key, [object_name, *sidecars.values()])
+                except Exception as release_error:
+                    print(f"Error releasing object {object_name}: {release_error}")
+            
             # Clean up temp files on error
             try:
                 import shutil
@@ -157,103 +580,337 @@ class YTDLPService:
                 pass
             raise Exception(f"Download failed: {str(e)}")
     
-    def get_user_videos(self, user_id, page=1, size=10, search_query=None):
-        """Get user's downloaded videos, optionally filtered by search_query"""
+    def _build_user_videos_query(self, user_id, search_query=None):
+        """Build the bool query for a user's unexpired videos
+        
+        Ownership and expiry are yes/no constraints, so they go in filter
+        context where they are not scored and can be cached by Elasticsearch.
+        The expiry cutoff is rounded down to the hour so the same filter is
+        reused for an hour instead of changing every millisecond.
+        """
+        cutoff = datetime.now().replace(minute=0, second=0, microsecond=0)
+        query = {
+            "bool": {
+                "filter": [
+                    {"term": {"user_id": user_id}},
+                    {"range": {"expiry_date": {"gte": cutoff.isoformat()}}}
+                ]
+            }
+        }
+        if search_query:
+            query["bool"]["must"] = [{
+                "multi_match": {
+                    "query": search_query,
+                    "fields": ["title", "description", "uploader"]
+                }
+            }]
+        return query
+    
+    def get_user_videos(self, user_id, cursor=None, size=10, search_query=None):
+        """Get a page of the user's downloaded videos, optionally filtered by search_query
+        
+        Pages are addressed with opaque cursors from the previous result
+        instead of offsets, so every page costs the same no matter how deep.
+        """
+        cached = self.dashboard_cache.get(user_id, cursor, size, search_query)
+        if cached is not None:
+            return cached
+        
+        direction, search_after = decode_cursor(cursor)
+        order = 'asc' if direction == 'before' else 'desc'
+        
         try:
-            must_clauses = [
-                {"term": {"user_id": user_id}},
-                {"range": {"expiry_date": {"gte": datetime.now().isoformat()}}}
-            ]
-            if search_query:
-                must_clauses.append({
-                    "multi_match": {
-                        "query": search_query,
-                        "fields": ["title", "description", "uploader"]
-                    }
-                })
-
             query = {
-                "query": {
-                    "bool": {
-                        "must": must_clauses
-                    }
-                },
-                "sort": [{"download_date": {"order": "desc"}}],
-                "from": (page - 1) * size,
-                "size": size
+                "query": self._build_user_videos_query(user_id, search_query),
+                # video_id breaks ties between videos downloaded in the same millisecond
+                "sort": [{"download_date": {"order": order}}, {"video_id": {"order": order}}],
+                "size": size + 1,
+                "track_total_hits": Config.DASHBOARD_TRACK_TOTAL_HITS
             }
+            if search_after:
+                query["search_after"] = search_after
+
+            result = self.es.search(index=VIDEOS_INDEX, routing=str(user_id), body=query)
 
-            result = self.es.search(index='video_downloads', body=query)
+            # One extra hit tells whether there is another page in this direction
+            hits = result['hits']['hits']
+            has_more = len(hits) > size
+            hits = hits[:size]
+            if direction == 'before':
+                hits.reverse()
 
             videos = []
-            for hit in result['hits']['hits']:
+            for hit in hits:
                 video = hit['_source']
                 video['id'] = hit['_id']
                 videos.append(video)
 
-            return {
+            next_cursor = None
+            prev_cursor = None
+            if hits:
+                if direction == 'before' or has_more:
+                    next_cursor = encode_cursor('after', hits[-1]['sort'])
+                # The first page has nothing newer, so it gets no previous cursor
+                if (direction == 'after' and search_after is not None) or (direction == 'before' and has_more):
+                    prev_cursor = encode_cursor('before', hits[0]['sort'])
+
+            videos_page = {
                 'videos': videos,
                 'total': result['hits']['total']['value'],
-                'page': page,
-                'pages': (result['hits']['total']['value'] + size - 1) // size
+                'total_exact': result['hits']['total']['relation'] == 'eq',
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
             }
 
         except Exception as e:
             raise Exception(f"Failed to retrieve videos: {str(e)}")
+        
+        self.dashboard_cache.set(user_id, videos_page, cursor, size, search_query)
+        return videos_page
     
-    def get_download_url(self, video_id, user_id):
-        """Generate presigned URL for video download"""
+    def get_thumbnail(self, video_id, user_id, if_none_match=None):
+        """Get a stored thumbnail as {'etag', 'data'}, or None if the video has none
+        
+        data is None when if_none_match already holds the current ETag.
+        """
         try:
-            # Verify video belongs to user
-            result = self.es.get(index='video_downloads', id=video_id)
-            video = result['_source']
+            record = self._check_video_record(video_id, user_id, self.download_url_cache.get_record(video_id))
             
-            if video['user_id'] != user_id:
-                raise Exception("Unauthorized access")
+            object_name = record.get('thumbnail_object_name')
+            if not object_name:
+                return None
             
-            if datetime.fromisoformat(video['expiry_date']) < datetime.now():
+            etag = object_etag(object_name)
+            if if_none_match and etag in if_none_match:
+                return {'etag': etag, 'data': None}
+            
+            response = self.minio_client.get_object(Config.MINIO_BUCKET, object_name)
+            try:
+                data = response.read()
+            finally:
+                response.close()
+                response.release_conn()
+            return {'etag': etag, 'data': data}
+            
+        except Exception as e:
+            raise Exception(f"Failed to get thumbnail: {str(e)}")
+    
+    def _check_video_record(self, video_id, user_id, record=None):
+        """Return the ownership record of a user's video, loading it from the index if not cached"""
+        if record is None:
+            result = self.es.get(
+                index=VIDEOS_INDEX,
+                id=video_id,
+                routing=str(user_id),
+                source_includes=['user_id', 'object_name', 'file_size', 'thumbnail_object_name', 'expiry_date']
+            )
+            video = result['_source']
+            record = {
+                'user_id': video['user_id'],
+                'object_name': video['object_name'],
+                'file_size': video.get('file_size'),
+                'thumbnail_object_name': video.get('thumbnail_object_name'),
+                'expires_at': datetime.fromisoformat(video['expiry_date']).timestamp()
+            }
+            self.download_url_cache.set_record(video_id, record)
+        
+        if record['user_id'] != user_id:
+            raise Exception("Unauthorized access")
+        return record
+    
+    def get_download_url(self, video_id, user_id):
+        """Generate presigned URL for video download, reusing a cached one while it is fresh"""
+        try:
+            cached, record = self.download_url_cache.get(video_id)
+            if cached and cached['user_id'] == user_id:
+                return cached['url']
+            
+            # Verify video belongs to user
+            record = self._check_video_record(video_id, user_id, record)
+            if record['expires_at'] < time.time():
                 raise Exception("Video has expired")
             
-            # Generate presigned URL (valid for 1 hour)
             url = self.minio_client.presigned_get_object(
                 Config.MINIO_BUCKET,
-                video['object_name'],
-                expires=timedelta(hours=1)
+                record['object_name'],
+                expires=timedelta(seconds=Config.DOWNLOAD_URL_EXPIRY)
             )
+            self.download_url_cache.set_url(video_id, user_id, url, record['expires_at'])
             
             return url
             
         except Exception as e:
             raise Exception(f"Failed to generate download URL: {str(e)}")
     
-    def cleanup_expired_videos(self):
-        """Remove expired videos from storage and index"""
+    def get_stream_target(self, video_id, user_id):
+        """Get the object name, size, content type and ETag needed to stream a user's video"""
         try:
-            query = {
-                "query": {
-                    "range": {
-                        "expiry_date": {"lt": datetime.now().isoformat()}
-                    }
-                }
+            record = self._check_video_record(video_id, user_id, self.download_url_cache.get_record(video_id))
+            if record['expires_at'] < time.time():
+                raise Exception("Video has expired")
+            
+            object_name = record['object_name']
+            size = record.get('file_size')
+            if size is None:
+                size = self.minio_client.stat_object(Config.MINIO_BUCKET, object_name).size
+            return {
+                'object_name': object_name,
+                'size': size,
+                'content_type': guess_content_type(object_name),
+                'etag': object_etag(object_name)
             }
             
-            # Find expired videos
-            result = self.es.search(index='video_downloads', body=query, size=1000)
+        except Exception as e:
+            raise Exception(f"Failed to open video stream: {str(e)}")
+    
+    def get_attachment_url(self, video_id, user_id):
+        """Generate presigned URL that makes browsers save the video instead of playing it"""
+        try:
+            record = self._check_video_record(video_id, user_id, self.download_url_cache.get_record(video_id))
+            if record['expires_at'] < time.time():
+                raise Exception("Video has expired")
             
-            for hit in result['hits']['hits']:
-                video = hit['_source']
+            return self.minio_client.presigned_get_object(
+                Config.MINIO_BUCKET,
+                record['object_name'],
+                expires=timedelta(seconds=Config.DOWNLOAD_URL_EXPIRY),
+                response_headers={
+                    'response-content-disposition': f'attachment; filename="{os.path.basename(record["object_name"])}"'
+                }
+            )
+            
+        except Exception as e:
+            raise Exception(f"Failed to generate download URL: {str(e)}")
+    
+    def delete_video(self, video_id, user_id):
+        """Delete a user's video, removing the file once no one else uses it"""
+        result = self.delete_videos([video_id], user_id)
+        if result['not_found']:
+            raise Exception("Failed to delete video: Video not found")
+        if result['failed']:
+            raise Exception("Failed to delete video: Elasticsearch rejected the delete")
+        return {'deleted': video_id}
+    
+    def delete_videos(self, video_ids, user_id):
+        """Delete a batch of a user's videos
+        
+        Ownership is checked with one mget, the docs are dropped with one bulk
+        request and the objects no one else uses are removed with batched
+        multi-object deletes. Ids that do not exist or belong to another user
+        are reported as not found.
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        stats = {'deleted': [], 'not_found': [], 'failed': [], 'objects_removed': 0}
+        if not video_ids:
+            return stats
+        try:
+            result = self.es.mget(
+                index=VIDEOS_INDEX,
+                ids=video_ids,
+                routing=str(user_id),
+                source_includes=['user_id', 'object_name', 'object_key', *SIDECAR_FIELDS]
+            )
+            videos = {}
+            for doc in result['docs']:
+                if doc.get('found') and doc['_source'].get('user_id') == user_id:
+                    videos[doc['_id']] = doc['_source']
+                else:
+                    stats['not_found'].append(doc['_id'])
+            if not videos:
+                return stats
+            
+            actions = [
+                {'_op_type': 'delete', '_index': VIDEOS_INDEX, '_id': video_id, '_routing': str(user_id)}
+                for video_id in videos
+            ]
+            _, failures = helpers.bulk(self.es, actions, raise_on_error=False, refresh='wait_for')
+            stats['failed'] = [failure['delete']['_id'] for failure in failures]
+            stats['deleted'] = [video_id for video_id in videos if video_id not in stats['failed']]
+            
+            self.dashboard_cache.invalidate(user_id)
+            self.download_url_cache.invalidate(*stats['deleted'])
+            stats['objects_removed'] = self.object_store.release_many(
+                (videos[video_id].get('object_key'), stored_object_names(videos[video_id]))
+                for video_id in stats['deleted']
+            )
+            return stats
+            
+        except Exception as e:
+            raise Exception(f"Failed to delete videos: {str(e)}")
+    
+    def refresh_metadata(self, max_videos=None):
+        """Bring the title, view count and other metadata of stale videos up to date"""
+        return self.metadata_refresher.run(max_videos)
+    
+    def cleanup_expired_videos(self, batch_size=None):
+        """Remove expired videos from storage and index
+        
+        Pages through every expired doc with a point in time and search_after,
+        deleting each page with one bulk request and releasing its objects in
+        batches. Returns counts and throughput.
+        """
+        batch_size = batch_size or Config.CLEANUP_BATCH_SIZE
+        stats = {'deleted': 0, 'objects_removed': 0, 'errors': 0}
+        started = time.perf_counter()
+        pit_id = None
+        try:
+            pit_id = self.es.open_point_in_time(index=VIDEOS_INDEX, keep_alive='2m')['id']
+            cutoff = datetime.now().isoformat()
+            search_after = None
+            
+            while True:
+                query = {
+                    "query": {
+                        "range": {
+                            "expiry_date": {"lt": cutoff}
+                        }
+                    },
+                    "pit": {"id": pit_id, "keep_alive": "2m"},
+                    "sort": [{"_shard_doc": "asc"}],
+                    "_source": ["object_name", "object_key", *SIDECAR_FIELDS],
+                    "size": batch_size
+                }
+                if search_after:
+                    query["search_after"] = search_after
                 
-                # Remove from MinIO
-                try:
-                    self.minio_client.remove_object(Config.MINIO_BUCKET, video['object_name'])
-                except:
-                    pass
+                result = self.es.search(body=query)
+                hits = result['hits']['hits']
+                if not hits:
+                    break
+                pit_id = result.get('pit_id', pit_id)
+                search_after = hits[-1]['sort']
                 
                 # Remove from Elasticsearch
-                self.es.delete(index='video_downloads', id=hit['_id'])
-            
-            return len(result['hits']['hits'])
+                actions = []
+                for hit in hits:
+                    action = {'_op_type': 'delete', '_index': hit['_index'], '_id': hit['_id']}
+                    if hit.get('_routing'):
+                        action['_routing'] = hit['_routing']
+                    actions.append(action)
+                deleted, failures = helpers.bulk(self.es, actions, raise_on_error=False)
+                failed_ids = {failure['delete']['_id'] for failure in failures}
+                stats['deleted'] += deleted
+                stats['errors'] += len(failures)
+                self.dashboard_cache.invalidate(*[hit['_routing'] for hit in hits if hit.get('_routing')])
+                self.download_url_cache.invalidate(*[hit['_id'] for hit in hits if hit['_id'] not in failed_ids])
+                
+                # Remove from MinIO once no other user references the object
+                stats['objects_removed'] += self.object_store.release_many(
+                    (hit['_source'].get('object_key'), stored_object_names(hit['_source']))
+                    for hit in hits if hit['_id'] not in failed_ids
+                )
             
         except Exception as e:
             print(f"Cleanup error: {e}")
-            return 0
\ No newline at end of file
+            stats['errors'] += 1
+        finally:
+            if pit_id:
+                try:
+                    self.es.close_point_in_time(id=pit_id)
+                except Exception:
+                    pass
+        
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = round(elapsed, 3)
+        stats['docs_per_second'] = round(stats['deleted'] / elapsed, 1) if elapsed else 0.0
+        return stats
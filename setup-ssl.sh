@@ -50,6 +50,7 @@ echo "🔧 Updating nginx configuration for SSL..."
 cp nginx/conf.d/default.conf nginx/conf.d/default.conf.backup
 
 # Update the config to enable SSL sections
+sed -i 's|# listen 443 ssl|listen 443 ssl|g' nginx/conf.d/default.conf
 sed -i 's|# return 301 https://|return 301 https://|g' nginx/conf.d/default.conf
 sed -i 's|# ssl_certificate|ssl_certificate|g' nginx/conf.d/default.conf
 sed -i 's|# ssl_certificate_key|ssl_certificate_key|g' nginx/conf.d/default.conf
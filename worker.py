@@ -0,0 +1,39 @@
+import signal
+import threading
+from config.config import Config
+from services.ytdlp_service import YTDLPService
+from services.job_queue import DownloadJobQueue, DownloadWorker
+from services.scheduler import create_scheduler
+from services.clients import warm_up
+from services.metrics import metrics_registry
+from prometheus_client import start_http_server
+
+def main():
+    """Run download jobs from the queue until stopped"""
+    shutdown = threading.Event()
+
+    def handle_signal(signum, frame):
+        shutdown.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"Startup timings: {warm_up()}")
+    if Config.WORKER_METRICS_PORT:
+        start_http_server(Config.WORKER_METRICS_PORT, registry=metrics_registry())
+
+    ytdlp_service = YTDLPService()
+    worker = DownloadWorker(ytdlp_service, DownloadJobQueue())
+    worker.start()
+    print(f"Download worker started with {worker.concurrency} threads")
+
+    scheduler = create_scheduler(ytdlp_service)
+    scheduler.start()
+
+    shutdown.wait()
+    print("Stopping download worker, waiting for running jobs...")
+    scheduler.shutdown(wait=False)
+    worker.stop(timeout=Config.DOWNLOAD_STOP_TIMEOUT)
+
+if __name__ == "__main__":
+    main()